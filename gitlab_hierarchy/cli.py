@@ -38,10 +38,12 @@ def cli():
 @click.option('--gitlab-url', default='https://gitlab.com', help='GitLab instance URL')
 @click.option('--token', default=lambda: os.getenv('GITLAB_TOKEN'), help='GitLab personal access token')
 @click.option('--snapshot-date', type=click.DateTime(formats=['%Y-%m-%d']), help='Snapshot date (default: today)')
-@click.option('--include-closed/--no-include-closed', default=True, help='Include closed items')
+@click.option('--include-closed/--no-include-closed', default=True,
+              help='Include closed items. --no-include-closed skips closed epics with their subtrees and leaves completion_pct empty')
 @click.option('--max-depth', type=int, default=20, help='Maximum hierarchy depth')
+@click.option('--use-graphql', is_flag=True, help='Fetch epic issues in batched GraphQL requests')
 @click.option('--verbose', is_flag=True, help='Verbose output')
-def extract_from_groups(group_ids, root_group_id, epic_iid, db_path, gitlab_url, token, snapshot_date, include_closed, max_depth, verbose):
+def extract_from_groups(group_ids, root_group_id, epic_iid, db_path, gitlab_url, token, snapshot_date, include_closed, max_depth, use_graphql, verbose):
     """
     Extract epic hierarchy from groups using in-memory method.
 
@@ -89,7 +91,8 @@ def extract_from_groups(group_ids, root_group_id, epic_iid, db_path, gitlab_url,
             snapshot_date=snapshot_date,
             include_closed=include_closed,
             max_depth=max_depth,
-            verbose=verbose
+            verbose=verbose,
+            use_graphql=use_graphql
         )
 
         extractor.close()
@@ -262,10 +265,12 @@ def export(db_path, output_format, output, root_id):
 
         # Build query
         if root_id:
-            sql = "SELECT * FROM gitlab_hierarchy WHERE root_id = ? AND is_latest = 1"
+            sql = ("SELECT * FROM gitlab_hierarchy LEFT JOIN gitlab_hierarchy_detail USING (id) "
+                   "WHERE root_id = ? AND is_latest = 1")
             params = (root_id,)
         else:
-            sql = "SELECT * FROM gitlab_hierarchy WHERE is_latest = 1"
+            sql = ("SELECT * FROM gitlab_hierarchy LEFT JOIN gitlab_hierarchy_detail USING (id) "
+                   "WHERE is_latest = 1")
             params = ()
 
         results = db.execute_query(sql, params)
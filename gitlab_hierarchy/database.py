@@ -9,7 +9,10 @@ from pathlib import Path
 from typing import Dict, List, Optional, Any
 import json
 
-from .models import SCHEMA_SQL, INDEXES_SQL, PROJECT_ISSUES_SCHEMA_SQL, PROJECT_ISSUES_INDEXES_SQL
+from .models import (
+    SCHEMA_SQL, INDEXES_SQL, DETAIL_SCHEMA_SQL, DETAIL_COLUMNS,
+    PROJECT_ISSUES_SCHEMA_SQL, PROJECT_ISSUES_INDEXES_SQL,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -22,9 +25,12 @@ class Database:
         Initialize database connection.
 
         Args:
-            db_path: Path to SQLite database file
+            db_path: Path to SQLite database file, or a "file:" URI
+                (e.g. "file:name?mode=memory&cache=shared")
         """
-        self.db_path = Path(db_path)
+        self.is_uri = str(db_path).startswith('file:')
+        # Path would collapse the "//" of a URI authority, so URIs stay strings
+        self.db_path = str(db_path) if self.is_uri else Path(db_path)
         self.conn = None
         self._connect()
         self._initialize_schema()
@@ -32,9 +38,19 @@ class Database:
     def _connect(self):
         """Establish database connection."""
         logger.info(f"Connecting to database: {self.db_path}")
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(str(self.db_path))
+        if not self.is_uri:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), uri=self.is_uri)
         self.conn.row_factory = sqlite3.Row
+
+        # Tune for bulk inserts: WAL + NORMAL sync avoids an fsync per commit
+        self.conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA cache_size=-65536;
+            PRAGMA mmap_size=268435456;
+        """)
         logger.info("Database connection established")
 
     def _initialize_schema(self):
@@ -43,8 +59,12 @@ class Database:
 
         cursor = self.conn.cursor()
 
-        # Create hierarchy table
+        # Create hierarchy table and detail side table
         cursor.execute(SCHEMA_SQL)
+        cursor.execute(DETAIL_SCHEMA_SQL)
+
+        # Databases created before the detail side table kept its columns inline
+        self._migrate_detail_columns(cursor)
 
         # Create hierarchy indexes
         for index_sql in INDEXES_SQL:
@@ -60,6 +80,38 @@ class Database:
         self.conn.commit()
         logger.info("Database schema initialized")
 
+    def _migrate_detail_columns(self, cursor):
+        """
+        Move detail columns of an older wide gitlab_hierarchy table into the side table.
+
+        The wide table is rebuilt with the current schema, since dropping
+        columns in place needs SQLite 3.35+. Runs once; afterwards the
+        detail columns no longer exist on gitlab_hierarchy.
+
+        Args:
+            cursor: Database cursor
+        """
+        existing = [row[1] for row in cursor.execute("PRAGMA table_info(gitlab_hierarchy)")]
+        legacy = [column for column in DETAIL_COLUMNS if column in existing]
+        if not legacy:
+            return
+
+        logger.info(f"Migrating columns {legacy} to gitlab_hierarchy_detail")
+
+        detail_columns = ', '.join(['id'] + legacy)
+        cursor.execute(
+            f"INSERT OR REPLACE INTO gitlab_hierarchy_detail ({detail_columns}) "
+            f"SELECT {detail_columns} FROM gitlab_hierarchy"
+        )
+
+        cursor.execute("ALTER TABLE gitlab_hierarchy RENAME TO gitlab_hierarchy_legacy")
+        cursor.execute(SCHEMA_SQL)
+        current = [row[1] for row in cursor.execute("PRAGMA table_info(gitlab_hierarchy)")]
+        kept = ', '.join(column for column in current if column in existing)
+        cursor.execute(f"INSERT INTO gitlab_hierarchy ({kept}) SELECT {kept} FROM gitlab_hierarchy_legacy")
+        # Indexes of the old table are dropped with it and recreated by the caller
+        cursor.execute("DROP TABLE gitlab_hierarchy_legacy")
+
     def insert_item(self, item: Dict[str, Any], snapshot_date: Optional[date] = None):
         """
         Insert a single hierarchy item.
@@ -85,21 +137,37 @@ class Database:
         fields_to_exclude = ['internal_id']
         item_filtered = {k: v for k, v in item.items() if k not in fields_to_exclude}
 
-        # Build INSERT statement
-        columns = list(item_filtered.keys())
+        # Split rarely-read columns off into the detail side table
+        detail = {'id': item_filtered.get('id')}
+        for field in DETAIL_COLUMNS:
+            if field in item_filtered:
+                detail[field] = item_filtered.pop(field)
+
+        cursor = self.conn.cursor()
+        self._insert_row(cursor, 'gitlab_hierarchy', item_filtered)
+        self._insert_row(cursor, 'gitlab_hierarchy_detail', detail)
+        self.conn.commit()
+
+        logger.debug(f"Inserted item: {item.get('id')}")
+
+    def _insert_row(self, cursor, table: str, row: Dict[str, Any]):
+        """
+        Insert or replace a single row.
+
+        Args:
+            cursor: Database cursor
+            table: Target table name
+            row: Column name to value mapping
+        """
+        columns = list(row.keys())
         placeholders = ','.join(['?' for _ in columns])
         column_names = ','.join(columns)
 
         sql = f"""
-            INSERT OR REPLACE INTO gitlab_hierarchy ({column_names})
+            INSERT OR REPLACE INTO {table} ({column_names})
             VALUES ({placeholders})
         """
-
-        cursor = self.conn.cursor()
-        cursor.execute(sql, [item_filtered[col] for col in columns])
-        self.conn.commit()
-
-        logger.debug(f"Inserted item: {item.get('id')}")
+        cursor.execute(sql, [row[col] for col in columns])
 
     def insert_batch(self, items: List[Dict[str, Any]], snapshot_date: Optional[date] = None):
         """
@@ -235,25 +303,37 @@ class Database:
             return date.fromisoformat(row['max_date'])
         return None
 
-    def get_item(self, item_id: str, latest_only: bool = True) -> Optional[Dict[str, Any]]:
+    def get_item(
+        self,
+        item_id: str,
+        latest_only: bool = True,
+        include_detail: bool = False
+    ) -> Optional[Dict[str, Any]]:
         """
         Retrieve a single item by ID.
 
         Args:
             item_id: Item ID to retrieve
             latest_only: Only get latest snapshot (default: True)
+            include_detail: Also load description and relationship columns
+                from the detail table (default: False)
 
         Returns:
             Item dictionary or None
         """
+        if include_detail:
+            source = "gitlab_hierarchy LEFT JOIN gitlab_hierarchy_detail USING (id)"
+        else:
+            source = "gitlab_hierarchy"
+
         if latest_only:
-            sql = """
-                SELECT * FROM gitlab_hierarchy
+            sql = f"""
+                SELECT * FROM {source}
                 WHERE id = ? AND is_latest = 1
             """
         else:
-            sql = """
-                SELECT * FROM gitlab_hierarchy
+            sql = f"""
+                SELECT * FROM {source}
                 WHERE id = ?
                 ORDER BY snapshot_date DESC
                 LIMIT 1
@@ -381,6 +461,12 @@ class Database:
         cursor = self.conn.cursor()
         cursor.execute(sql, (cutoff_date.isoformat(),))
         deleted_count = cursor.rowcount
+
+        # Drop detail rows whose item no longer exists
+        cursor.execute("""
+            DELETE FROM gitlab_hierarchy_detail
+            WHERE id NOT IN (SELECT id FROM gitlab_hierarchy)
+        """)
         self.conn.commit()
 
         logger.info(f"Cleaned up {deleted_count} old snapshots (kept last {keep_days} days)")
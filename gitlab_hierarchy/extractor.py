@@ -4,7 +4,7 @@ Main hierarchy extraction orchestrator.
 
 import logging
 import time
-from datetime import date
+from datetime import date, datetime, timezone
 from typing import Optional
 from tqdm import tqdm
 
@@ -33,7 +33,9 @@ class HierarchyExtractor:
             gitlab_url: GitLab instance URL
             token: Personal access token
             db_path: Path to SQLite database
-            **kwargs: Additional configuration options
+            **kwargs: Additional configuration options (timeout, max_retries,
+                rate_limit_delay, max_workers, label_patterns). max_workers > 1
+                fetches epic issues concurrently, multiplying the request rate
         """
         self.gitlab_url = gitlab_url
         self.db_path = db_path
@@ -49,7 +51,7 @@ class HierarchyExtractor:
             rate_limit_delay=kwargs.get('rate_limit_delay', 0.5)
         )
 
-        self.builder = HierarchyBuilder(self.client)
+        self.builder = HierarchyBuilder(self.client, max_workers=kwargs.get('max_workers', 1))
         self.label_parser = LabelParser(patterns=kwargs.get('label_patterns'))
         self.db = Database(db_path)
 
@@ -63,7 +65,8 @@ class HierarchyExtractor:
         snapshot_date: Optional[date] = None,
         include_closed: bool = True,
         max_depth: int = 20,
-        verbose: bool = False
+        verbose: bool = False,
+        use_graphql: bool = False
     ) -> dict:
         """
         Extract hierarchy using in-memory method by fetching all epics upfront.
@@ -77,9 +80,11 @@ class HierarchyExtractor:
             root_group_id: Group ID containing the root epic
             root_epic_iid: IID of the root epic
             snapshot_date: Date of snapshot (defaults to today)
-            include_closed: Include closed items
+            include_closed: Include closed items. When False, closed epics are
+                skipped with their subtrees and completion_pct is left empty
             max_depth: Maximum depth to traverse
             verbose: Show progress bars
+            use_graphql: Fetch epic issues in batched GraphQL requests
 
         Returns:
             Summary statistics dictionary
@@ -100,6 +105,7 @@ class HierarchyExtractor:
         logger.info(f"  Snapshot Date: {snapshot_date}")
         logger.info(f"  Include Closed: {include_closed}")
         logger.info(f"  Max Depth: {max_depth}")
+        logger.info(f"  Use GraphQL: {use_graphql}")
         logger.info("")
 
         # Phase 1: Discover hierarchy structure using in-memory method
@@ -111,7 +117,8 @@ class HierarchyExtractor:
             root_group_id=root_group_id,
             root_epic_iid=root_epic_iid,
             max_depth=max_depth,
-            include_closed=include_closed
+            include_closed=include_closed,
+            use_graphql=use_graphql
         )
 
         epic_count = sum(1 for item in items if item['type'] == 'epic')
@@ -157,10 +164,10 @@ class HierarchyExtractor:
         root_id = f"epic:{root_group_id}#{root_epic_iid}"
         stats = self.db.get_stats(root_id=root_id)
 
-        open_count = stats.get('open_count', 0)
-        closed_count = stats.get('closed_count', 0)
-        max_depth_val = stats.get('max_depth', 0)
-        avg_depth_val = stats.get('avg_depth', 0)
+        open_count = stats.get('open_count') or 0
+        closed_count = stats.get('closed_count') or 0
+        max_depth_val = stats.get('max_depth') or 0
+        avg_depth_val = stats.get('avg_depth') or 0
         leaf_count = stats.get('leaf_count', 0)
 
         logger.info(f"✓ Statistics calculated")
@@ -175,8 +182,12 @@ class HierarchyExtractor:
         logger.info(f"Total Items: {len(items)}")
         logger.info(f"  Epics: {epic_count}")
         logger.info(f"  Issues: {issue_count}")
-        logger.info(f"Open: {open_count} ({open_count/len(items)*100:.1f}%)")
-        logger.info(f"Closed: {closed_count} ({closed_count/len(items)*100:.1f}%)")
+        if items:
+            logger.info(f"Open: {open_count} ({open_count/len(items)*100:.1f}%)")
+            logger.info(f"Closed: {closed_count} ({closed_count/len(items)*100:.1f}%)")
+        else:
+            logger.info("Open: 0")
+            logger.info("Closed: 0")
         logger.info(f"Max Depth: {max_depth_val} levels")
         logger.info(f"Avg Depth: {avg_depth_val:.1f} levels")
         logger.info(f"Leaf Nodes: {leaf_count}")
@@ -278,7 +289,6 @@ class HierarchyExtractor:
         logger.info("Phase 3: Calculating metrics")
         logger.info("-" * 80)
 
-        from datetime import datetime, timezone
         now = datetime.now(timezone.utc)
 
         for issue in all_issues:
@@ -365,11 +375,8 @@ class HierarchyExtractor:
         if not dt_str:
             return None
         try:
-            from datetime import datetime
-            if '.' in dt_str:
-                return datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
-            else:
-                return datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
+            # fromisoformat only accepts a 'Z' suffix from Python 3.11 on
+            return datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
         except Exception:
             return None
 
@@ -378,8 +385,7 @@ class HierarchyExtractor:
         if not date_str:
             return None
         try:
-            from datetime import datetime
-            return datetime.fromisoformat(date_str).date()
+            return date.fromisoformat(date_str[:10])
         except Exception:
             return None
 
@@ -413,3 +419,11 @@ class HierarchyExtractor:
     def close(self):
         """Close connections."""
         self.db.close()
+
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        self.close()
@@ -3,6 +3,7 @@ GitLab API client wrapper for hierarchy extraction.
 """
 
 import logging
+import sys
 import time
 from typing import Dict, List, Optional, Set
 import gitlab
@@ -10,6 +11,52 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# GitLab's maximum page size; the default of 20 would need five times the requests
+PER_PAGE = 100
+
+# Epics of one group with their issues, shaped after the REST issue fields
+EPIC_ISSUES_QUERY = """
+query($fullPath: ID!, $iids: [ID!], $after: String) {
+  group(fullPath: $fullPath) {
+    epics(iids: $iids, includeDescendantGroups: false, first: 100, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        id
+        iid
+        title
+        issues(first: 100) {
+          pageInfo { hasNextPage }
+          nodes {
+            id iid projectId title description state webUrl type
+            author { username name }
+            assignees(first: 1) { nodes { username name } }
+            milestone { id title }
+            confidential discussionLocked weight severity
+            timeEstimate totalTimeSpent
+            createdAt updatedAt closedAt dueDate
+            labels { nodes { title } }
+            upvotes downvotes userNotesCount mergeRequestsCount
+            taskCompletionStatus { count completedCount }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+def _gid_to_int(gid: Optional[str]) -> Optional[int]:
+    """Extract the numeric ID from a GraphQL global ID (gid://gitlab/Issue/123)."""
+    if not gid:
+        return None
+    return int(gid.rsplit('/', 1)[-1])
+
+
+def _intern(value):
+    """Intern string values; anything else (e.g. a missing None) passes through."""
+    return sys.intern(value) if isinstance(value, str) else value
+
 
 class GitLabClient:
     """Wrapper for python-gitlab with hierarchy-specific methods."""
@@ -30,7 +77,7 @@ class GitLabClient:
             token: Personal access token
             timeout: Request timeout in seconds
             max_retries: Maximum retry attempts
-            rate_limit_delay: Delay between requests in seconds
+            rate_limit_delay: Delay after each request in seconds, per calling thread
         """
         self.gitlab_url = gitlab_url
         self.timeout = timeout
@@ -68,7 +115,7 @@ class GitLabClient:
         logger.debug(f"Fetching epic: group {group_id}, epic #{epic_iid}")
 
         try:
-            group = self.gl.groups.get(group_id)
+            group = self.gl.groups.get(group_id, lazy=True)
             epic = group.epics.get(epic_iid)
 
             return self._epic_to_dict(epic, group_id)
@@ -97,9 +144,9 @@ class GitLabClient:
         logger.debug(f"Fetching all epics for group {group_id}")
 
         try:
-            group = self.gl.groups.get(group_id)
-            # Fetch all epics WITHOUT parent_id filter
-            all_epics = group.epics.list(get_all=True)
+            group = self.gl.groups.get(group_id, lazy=True)
+            # Fetch all epics WITHOUT parent_id filter, streaming 100-item pages
+            all_epics = group.epics.list(iterator=True, per_page=PER_PAGE)
 
             time.sleep(self.rate_limit_delay)
 
@@ -129,7 +176,7 @@ class GitLabClient:
 
         logger.info(f"Fetching epics from {len(group_ids)} groups")
 
-        for group_id in group_ids:
+        for group_id in dict.fromkeys(group_ids):
             epics = self.get_all_group_epics(group_id)
             all_epics.extend(epics)
 
@@ -150,9 +197,10 @@ class GitLabClient:
         logger.debug(f"Fetching issues for epic #{epic_iid}")
 
         try:
-            group = self.gl.groups.get(group_id)
-            epic = group.epics.get(epic_iid)
-            issues = epic.issues.list(get_all=True)
+            # Lazy objects skip their own GET requests; only the issue list hits the API
+            group = self.gl.groups.get(group_id, lazy=True)
+            epic = group.epics.get(epic_iid, lazy=True)
+            issues = epic.issues.list(iterator=True, per_page=PER_PAGE)
 
             time.sleep(self.rate_limit_delay)
 
@@ -162,6 +210,71 @@ class GitLabClient:
             logger.warning(f"Could not fetch epic issues: {e}")
             return []
 
+    def get_epics_issues_graphql(self, group_id: int, epic_iids: List[int]) -> Dict[int, List[Dict]]:
+        """
+        Get issues for many epics of one group in batched GraphQL requests.
+
+        Each request returns up to 100 epics together with their issues, which
+        replaces three REST calls per epic. Epics with more than 100 issues are
+        left out of the result so callers can fetch them through REST instead.
+
+        Args:
+            group_id: Group ID
+            epic_iids: Epic IIDs within the group
+
+        Returns:
+            Dictionary mapping epic IID to its list of issue dictionaries.
+            Empty if the GraphQL API is unavailable.
+        """
+        logger.debug(f"Fetching issues for {len(epic_iids)} epics in group {group_id} via GraphQL")
+
+        result = {}
+        try:
+            full_path = self.gl.groups.get(group_id).full_path
+            variables = {
+                'fullPath': full_path,
+                'iids': [str(iid) for iid in epic_iids],
+                'after': None
+            }
+
+            while True:
+                response = self.gl.http_post(
+                    f"{self.gitlab_url.rstrip('/')}/api/graphql",
+                    post_data={'query': EPIC_ISSUES_QUERY, 'variables': variables}
+                )
+                time.sleep(self.rate_limit_delay)
+
+                if response.get('errors'):
+                    logger.warning(f"GraphQL errors: {response['errors']}")
+                    return {}
+
+                epics = response['data']['group']['epics']
+                for node in epics['nodes']:
+                    epic_iid = int(node['iid'])
+                    if node['issues']['pageInfo']['hasNextPage']:
+                        logger.debug(f"Epic #{epic_iid} has more than 100 issues, leaving it to REST")
+                        continue
+                    epic_info = {
+                        'id': _gid_to_int(node['id']),
+                        'iid': epic_iid,
+                        'group_id': group_id,
+                        'title': node['title']
+                    }
+                    result[epic_iid] = [
+                        self._graphql_issue_to_dict(issue, epic_info)
+                        for issue in node['issues']['nodes']
+                    ]
+
+                if not epics['pageInfo']['hasNextPage']:
+                    break
+                variables['after'] = epics['pageInfo']['endCursor']
+
+        except Exception as e:
+            logger.warning(f"Could not fetch epic issues via GraphQL: {e}")
+            return {}
+
+        return result
+
     def get_all_group_projects(self, group_id: int) -> List[Dict]:
         """
         Get all projects in a group.
@@ -175,9 +288,9 @@ class GitLabClient:
         logger.debug(f"Fetching all projects for group {group_id}")
 
         try:
-            group = self.gl.groups.get(group_id)
+            group = self.gl.groups.get(group_id, lazy=True)
             # Fetch all projects including subgroups
-            projects = group.projects.list(get_all=True, include_subgroups=True)
+            projects = group.projects.list(get_all=True, per_page=PER_PAGE, include_subgroups=True)
 
             time.sleep(self.rate_limit_delay)
 
@@ -214,8 +327,8 @@ class GitLabClient:
         logger.debug(f"Fetching all issues for project {project_id}")
 
         try:
-            project = self.gl.projects.get(project_id)
-            issues = project.issues.list(get_all=True)
+            project = self.gl.projects.get(project_id, lazy=True)
+            issues = project.issues.list(iterator=True, per_page=PER_PAGE)
 
             time.sleep(self.rate_limit_delay)
 
@@ -249,7 +362,7 @@ class GitLabClient:
         logger.info(f"Fetching all projects from {len(group_ids)} groups")
 
         # Step 1: Get all projects from all groups
-        for group_id in group_ids:
+        for group_id in dict.fromkeys(group_ids):
             projects = self.get_all_group_projects(group_id)
             all_projects.extend(projects)
 
@@ -278,7 +391,7 @@ class GitLabClient:
         logger.debug(f"Fetching issue: project {project_id}, issue #{issue_iid}")
 
         try:
-            project = self.gl.projects.get(project_id)
+            project = self.gl.projects.get(project_id, lazy=True)
             issue = project.issues.get(issue_iid)
 
             time.sleep(self.rate_limit_delay)
@@ -309,9 +422,9 @@ class GitLabClient:
         }
 
         try:
-            project = self.gl.projects.get(project_id)
-            issue = project.issues.get(issue_iid)
-            issue_links = issue.links.list(get_all=True)
+            project = self.gl.projects.get(project_id, lazy=True)
+            issue = project.issues.get(issue_iid, lazy=True)
+            issue_links = issue.links.list(get_all=True, per_page=PER_PAGE)
 
             for link in issue_links:
                 try:
@@ -393,7 +506,8 @@ class GitLabClient:
             'internal_id': epic.id,  # GitLab's internal ID
             'title': epic.title,
             'description': getattr(epic, 'description', ''),
-            'state': epic.state,
+            # Interned: low-cardinality values repeated on every item
+            'state': _intern(epic.state),
             'web_url': epic.web_url,
             'author_username': getattr(epic.author, 'username', None) if hasattr(epic, 'author') else None,
             'author_name': getattr(epic.author, 'name', None) if hasattr(epic, 'author') else None,
@@ -421,7 +535,7 @@ class GitLabClient:
             'internal_id': issue.id,
             'title': issue.title,
             'description': getattr(issue, 'description', ''),
-            'state': issue.state,
+            'state': _intern(issue.state),
             'web_url': issue.web_url,
             'author_username': getattr(issue.author, 'username', None) if hasattr(issue, 'author') else None,
             'author_name': getattr(issue.author, 'name', None) if hasattr(issue, 'author') else None,
@@ -429,7 +543,7 @@ class GitLabClient:
             'assignee_name': getattr(issue.assignee, 'name', None) if hasattr(issue, 'assignee') and issue.assignee else None,
             'milestone_title': getattr(issue.milestone, 'title', None) if hasattr(issue, 'milestone') and issue.milestone else None,
             'milestone_id': getattr(issue.milestone, 'id', None) if hasattr(issue, 'milestone') and issue.milestone else None,
-            'issue_type': getattr(issue, 'issue_type', 'issue'),
+            'issue_type': _intern(getattr(issue, 'issue_type', 'issue')),
             'confidential': getattr(issue, 'confidential', False),
             'discussion_locked': getattr(issue, 'discussion_locked', False),
             'weight': getattr(issue, 'weight', None),
@@ -454,3 +568,53 @@ class GitLabClient:
             'epic_group_id': getattr(epic_info, 'group_id', None) if epic_info else None,
             'epic_title': getattr(epic_info, 'title', None) if epic_info else None,
         }
+
+    def _graphql_issue_to_dict(self, issue: Dict, epic_info: Dict) -> Dict:
+        """Convert a GraphQL issue node to the same dictionary as _issue_to_dict."""
+        author = issue.get('author') or {}
+        assignees = (issue.get('assignees') or {}).get('nodes') or []
+        assignee = assignees[0] if assignees else {}
+        milestone = issue.get('milestone') or {}
+        tasks = issue.get('taskCompletionStatus')
+
+        return {
+            'type': 'issue',
+            'id': f"issue:{issue['projectId']}#{issue['iid']}",
+            'iid': int(issue['iid']),
+            'project_id': issue['projectId'],
+            'internal_id': _gid_to_int(issue['id']),
+            'title': issue['title'],
+            'description': issue.get('description') or '',
+            'state': _intern(issue['state']),
+            'web_url': issue['webUrl'],
+            'author_username': author.get('username'),
+            'author_name': author.get('name'),
+            'assignee_username': assignee.get('username'),
+            'assignee_name': assignee.get('name'),
+            'milestone_title': milestone.get('title'),
+            'milestone_id': _gid_to_int(milestone.get('id')),
+            'issue_type': _intern((issue.get('type') or 'issue').lower()),
+            'confidential': issue.get('confidential', False),
+            'discussion_locked': issue.get('discussionLocked') or False,
+            'weight': issue.get('weight'),
+            'story_points': issue.get('weight'),  # Alias
+            'time_estimate': issue.get('timeEstimate') or 0,
+            'time_spent': issue.get('totalTimeSpent') or 0,
+            'severity': issue.get('severity'),
+            'created_at': issue['createdAt'],
+            'updated_at': issue['updatedAt'],
+            'closed_at': issue.get('closedAt'),
+            'due_date': issue.get('dueDate'),
+            'labels_raw': [label['title'] for label in (issue.get('labels') or {}).get('nodes', [])],
+            'upvotes': issue.get('upvotes', 0),
+            'downvotes': issue.get('downvotes', 0),
+            'user_notes_count': issue.get('userNotesCount', 0),
+            'merge_requests_count': issue.get('mergeRequestsCount', 0),
+            'has_tasks': bool(tasks and tasks.get('count')),
+            'task_completion_status': tasks.get('completedCount', 0) if tasks else None,
+            # Epic relationship fields
+            'epic_id': epic_info['id'],
+            'epic_iid': epic_info['iid'],
+            'epic_group_id': epic_info['group_id'],
+            'epic_title': epic_info['title'],
+        }
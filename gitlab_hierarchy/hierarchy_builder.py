@@ -3,26 +3,42 @@ Hierarchy tree traversal and relationship building logic.
 """
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, List, Set, Optional
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1024)
+def _parse_iso_date(date_str: str) -> Optional[date]:
+    """Parse an ISO date string; due dates repeat heavily, so results are memoized."""
+    try:
+        return date.fromisoformat(date_str[:10])
+    except Exception:
+        return None
+
+
 class HierarchyBuilder:
     """Build hierarchy tree from GitLab epics and issues."""
 
-    def __init__(self, gitlab_client):
+    def __init__(self, gitlab_client, max_workers: int = 1):
         """
         Initialize hierarchy builder.
 
         Args:
             gitlab_client: GitLabClient instance
+            max_workers: Maximum concurrent epic issue requests. Each worker
+                applies the client's rate_limit_delay on its own, so the request
+                rate grows with the worker count
         """
         self.client = gitlab_client
+        self.max_workers = max_workers
         self.visited_epics: Set[str] = set()
         self.visited_issues: Set[str] = set()
         self.all_items: List[Dict] = []
+        self.items_by_id: Dict[str, Dict] = {}
 
     def build_from_groups(
         self,
@@ -30,7 +46,8 @@ class HierarchyBuilder:
         root_epic_iid: int,
         root_group_id: int,
         max_depth: int = 20,
-        include_closed: bool = True
+        include_closed: bool = True,
+        use_graphql: bool = False
     ) -> List[Dict]:
         """
         Build hierarchy by fetching all epics first, then building relationships.
@@ -45,7 +62,11 @@ class HierarchyBuilder:
             root_epic_iid: IID of the root epic
             root_group_id: Group ID containing the root epic
             max_depth: Maximum hierarchy depth
-            include_closed: Include closed items in metrics
+            include_closed: Include closed items. When False, closed epics are
+                skipped together with their whole subtree, and so are closed issues;
+                completion_pct is then None, since closed children are not counted
+            use_graphql: Fetch epic issues in batched GraphQL requests, falling
+                back to per-epic REST calls for epics GraphQL did not return
 
         Returns:
             List of all items (epics and issues) with hierarchy metadata
@@ -56,15 +77,18 @@ class HierarchyBuilder:
         self.visited_epics.clear()
         self.visited_issues.clear()
         self.all_items.clear()
+        self.items_by_id.clear()
 
         # Step 1: Fetch ALL epics from all groups upfront
         logger.info("Fetching all epics from groups...")
         all_epics = self.client.get_all_epics_for_groups(group_ids)
         logger.info(f"Fetched {len(all_epics)} total epics")
 
-        # Step 2: Build epic lookup by internal_id for fast parent-child matching
-        epics_by_id = {epic['internal_id']: epic for epic in all_epics}
-        logger.debug(f"Built lookup table for {len(epics_by_id)} epics")
+        # Step 2: Index epics by parent internal_id for fast parent-child matching
+        children_by_parent: Dict[int, List[Dict]] = {}
+        for epic in all_epics:
+            children_by_parent.setdefault(epic.get('parent_epic_id'), []).append(epic)
+        logger.debug(f"Built child lookup table for {len(children_by_parent)} parent epics")
 
         # Step 3: Find root epic
         root_epic_key = f"epic:{root_group_id}#{root_epic_iid}"
@@ -83,48 +107,54 @@ class HierarchyBuilder:
         root_id = root_epic['id']
         logger.info(f"Root epic: {root_epic['title']}")
 
-        # Step 4: Initialize root epic metadata
-        root_epic['depth'] = 0
-        root_epic['parent_id'] = None
-        root_epic['parent_type'] = None
-        root_epic['root_id'] = root_id
-        root_epic['hierarchy_path'] = root_id
-
-        self.all_items.append(root_epic)
-        self.visited_epics.add(root_epic['internal_id'])
-
-        # Step 5: Recursively traverse using in-memory parent_id lookup
+        # Step 4: Traverse child epics depth-first using in-memory parent_id lookup
         self._traverse_child_epics_from_memory(
-            epics_by_id=epics_by_id,
-            parent_internal_id=root_epic['internal_id'],
-            parent_id=root_id,
-            root_id=root_id,
-            depth=1,
+            children_by_parent=children_by_parent,
+            root_epic=root_epic,
             max_depth=max_depth,
-            hierarchy_path=root_id
+            include_closed=include_closed
         )
 
-        # Step 6: Fetch issues for all epics in the hierarchy
-        epic_count = 0
+        # Step 5: Fetch issues for all epics in the hierarchy
         logger.info("Fetching issues for all epics in hierarchy...")
-        for item in self.all_items:
-            if item['type'] == 'epic':
-                epic_count += 1
-                self._traverse_epic_issues(
-                    group_id=item['group_id'],
-                    epic_iid=item['iid'],
-                    parent_id=item['id'],
-                    root_id=root_id,
-                    depth=item['depth'] + 1,
-                    hierarchy_path=item['hierarchy_path']
-                )
+        hierarchy_epics = list(self.all_items)
+        epic_count = len(hierarchy_epics)
+
+        batched_issues = {}
+        if use_graphql:
+            iids_by_group: Dict[int, List[int]] = {}
+            for epic in hierarchy_epics:
+                iids_by_group.setdefault(epic['group_id'], []).append(epic['iid'])
+            for group_id, iids in iids_by_group.items():
+                for epic_iid, issues in self.client.get_epics_issues_graphql(group_id, iids).items():
+                    batched_issues[(group_id, epic_iid)] = issues
+
+        # Remaining epics are fetched over REST, concurrently when max_workers > 1;
+        # the requests are independent and latency-bound. Results are attached
+        # below on this thread, in hierarchy order, so item order stays deterministic.
+        pending = [
+            epic for epic in hierarchy_epics
+            if (epic['group_id'], epic['iid']) not in batched_issues
+        ]
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for epic, issues in zip(pending, executor.map(self._fetch_epic_issues, pending)):
+                    batched_issues[(epic['group_id'], epic['iid'])] = issues
+
+        for epic in hierarchy_epics:
+            self._traverse_epic_issues(
+                epic=epic,
+                root_id=root_id,
+                issues=batched_issues[(epic['group_id'], epic['iid'])],
+                include_closed=include_closed
+            )
 
         logger.info(f"✓ Found {epic_count} epics in hierarchy")
         logger.info(f"✓ Found {len(self.all_items) - epic_count} issues")
 
-        # Step 7: Calculate relationships and metrics
-        self._calculate_relationships()
-        self._calculate_metrics(include_closed)
+        # Step 6: Calculate relationships and metrics
+        parent_children = self._calculate_relationships()
+        self._calculate_metrics(include_closed, parent_children)
 
         logger.info(f"✓ Built complete hierarchy: {len(self.all_items)} total items")
 
@@ -137,125 +167,165 @@ class HierarchyBuilder:
 
     def _traverse_child_epics_from_memory(
         self,
-        epics_by_id: Dict[int, Dict],
-        parent_internal_id: int,
-        parent_id: str,
-        root_id: str,
-        depth: int,
+        children_by_parent: Dict[int, List[Dict]],
+        root_epic: Dict,
         max_depth: int,
-        hierarchy_path: str
+        include_closed: bool = True
     ):
         """
-        Recursively traverse child epics using in-memory parent_id lookup.
+        Traverse child epics using in-memory parent_id lookup.
 
         This method builds the hierarchy by filtering epics whose parent_epic_id
         matches the current parent's internal_id, rather than relying on GitLab's
-        API filtering.
+        API filtering. Traversal uses an explicit stack instead of recursion, so
+        deep hierarchies cannot hit Python's recursion limit. Epics are appended
+        in depth-first pre-order, the same order as a recursive walk.
+
+        Cycle detection is a set lookup: an epic is skipped if it was already
+        processed (visited_epics) or is waiting on the stack (in_stack).
 
         Args:
-            epics_by_id: Dictionary mapping internal_id to epic dict
-            parent_internal_id: Parent epic's GitLab internal ID
-            parent_id: Parent's project ID (e.g., "epic:123#10")
-            root_id: Root epic's project ID
-            depth: Current depth in hierarchy
+            children_by_parent: Dictionary mapping parent internal_id to child epic dicts
+            root_epic: Root epic dict
             max_depth: Maximum depth to traverse
-            hierarchy_path: Path from root (e.g., "epic:1#1/epic:1#2")
+            include_closed: If False, closed child epics are not descended into
         """
-        if depth > max_depth:
-            logger.warning(f"Maximum depth {max_depth} reached")
-            return
-
-        # Find all epics whose parent_epic_id matches this epic's internal_id
-        child_epics = [
-            epic for epic in epics_by_id.values()
-            if epic.get('parent_epic_id') == parent_internal_id
-        ]
-
-        logger.debug(f"Found {len(child_epics)} children for epic ID {parent_internal_id} at depth {depth}")
+        root_id = root_epic['id']
+        # Entries are (epic, parent epic dict); depth and path are read off the parent
+        stack = [(root_epic, None)]
+        in_stack: Set[int] = {root_epic['internal_id']}
 
-        for epic in child_epics:
+        while stack:
+            epic, parent = stack.pop()
             epic_internal_id = epic['internal_id']
             epic_id = epic['id']
+            in_stack.discard(epic_internal_id)
+
+            # Add hierarchy metadata, extending the parent's already computed path
+            if parent is None:
+                depth = 0
+                epic['parent_id'] = None
+                epic['parent_type'] = None
+                epic['hierarchy_path'] = epic_id
+            else:
+                depth = parent['depth'] + 1
+                epic['parent_id'] = parent['id']
+                epic['parent_type'] = 'epic'
+                epic['hierarchy_path'] = parent['hierarchy_path'] + '/' + epic_id
+            epic['depth'] = depth
+            epic['root_id'] = root_id
+
+            self.all_items.append(epic)
+            self.items_by_id[epic_id] = epic
+            self.visited_epics.add(epic_internal_id)
+
+            # Find all epics whose parent_epic_id matches this epic's internal_id
+            child_epics = children_by_parent.get(epic_internal_id, [])
+            if not child_epics:
+                continue
 
-            # Cycle detection - prevent infinite loops
-            if epic_internal_id in self.visited_epics:
+            # Depth is checked before children are pushed, so pruned subtrees are never visited
+            if depth + 1 > max_depth:
                 logger.warning(
-                    f"Circular reference detected for epic {epic_id} "
-                    f"(parent: {parent_id}). Skipping to avoid infinite loop."
+                    f"Maximum depth {max_depth} reached: skipping {len(child_epics)} "
+                    f"child epic(s) of {epic_id}"
                 )
                 continue
 
-            # Add hierarchy metadata
-            epic['depth'] = depth
-            epic['parent_id'] = parent_id
-            epic['parent_type'] = 'epic'
-            epic['root_id'] = root_id
-            epic['hierarchy_path'] = f"{hierarchy_path}/{epic_id}"
+            logger.debug(f"Found {len(child_epics)} children for epic ID {epic_internal_id} at depth {depth + 1}")
 
-            self.all_items.append(epic)
-            self.visited_epics.add(epic_internal_id)
+            # Push in reverse so children are processed in their original order
+            for child in reversed(child_epics):
+                child_internal_id = child['internal_id']
 
-            # Recurse to this epic's children
-            self._traverse_child_epics_from_memory(
-                epics_by_id=epics_by_id,
-                parent_internal_id=epic_internal_id,
-                parent_id=epic_id,
-                root_id=root_id,
-                depth=depth + 1,
-                max_depth=max_depth,
-                hierarchy_path=epic['hierarchy_path']
-            )
+                # Skip closed subtrees before any of their issues are fetched
+                if not include_closed and child['state'] == 'closed':
+                    continue
+
+                # Cycle detection - prevent infinite loops
+                if child_internal_id in self.visited_epics or child_internal_id in in_stack:
+                    logger.warning(
+                        f"Circular reference detected for epic {child['id']} "
+                        f"(parent: {epic_id}). Skipping to avoid infinite loop."
+                    )
+                    continue
+
+                stack.append((child, epic))
+                in_stack.add(child_internal_id)
+
+    def _fetch_epic_issues(self, epic: Dict) -> List[Dict]:
+        """Fetch an epic's issues over REST, returning an empty list on errors."""
+        try:
+            return self.client.get_epic_issues(epic['group_id'], epic['iid'])
+        except Exception as e:
+            logger.warning(f"Error fetching epic issues: {e}")
+            return []
 
     def _traverse_epic_issues(
         self,
-        group_id: int,
-        epic_iid: int,
-        parent_id: str,
+        epic: Dict,
         root_id: str,
-        depth: int,
-        hierarchy_path: str
+        issues: List[Dict],
+        include_closed: bool = True
     ):
-        """Get all issues in an epic."""
-        try:
-            issues = self.client.get_epic_issues(group_id, epic_iid)
-            logger.debug(f"Found {len(issues)} issue(s) in epic #{epic_iid}")
-
-            for issue in issues:
-                issue_id = issue['id']
-
-                # Skip if already visited
-                if issue_id in self.visited_issues:
-                    continue
+        """Attach an epic's already fetched issues, deriving depth and path from the epic."""
+        epic_iid = epic['iid']
+        parent_id = epic['id']
+        depth = epic['depth'] + 1
+        path_prefix = epic['hierarchy_path'] + '/'
+        logger.debug(f"Found {len(issues)} issue(s) in epic #{epic_iid}")
+
+        for issue in issues:
+            issue_id = issue['id']
+
+            # Skip if already visited or filtered out
+            if issue_id in self.visited_issues:
+                continue
+            if not include_closed and issue['state'] == 'closed':
+                continue
 
-                # Add metadata
-                issue['depth'] = depth
-                issue['root_id'] = root_id
-                issue['parent_id'] = parent_id
-                issue['parent_type'] = 'epic'
-                issue['hierarchy_path'] = f"{hierarchy_path}/{issue_id}"
-                issue['epic_iid'] = epic_iid
+            # Add metadata
+            issue['depth'] = depth
+            issue['root_id'] = root_id
+            issue['parent_id'] = parent_id
+            issue['parent_type'] = 'epic'
+            issue['hierarchy_path'] = path_prefix + issue_id
+            issue['epic_iid'] = epic_iid
 
-                self.all_items.append(issue)
-                self.visited_issues.add(issue_id)
+            self.all_items.append(issue)
+            self.items_by_id[issue_id] = issue
+            self.visited_issues.add(issue_id)
 
-                # TODO: Optionally traverse issue blocking relationships
-                # This would add issues that this issue blocks
+            # TODO: Optionally traverse issue blocking relationships
+            # This would add issues that this issue blocks
 
-        except Exception as e:
-            logger.warning(f"Error fetching epic issues: {e}")
+    def _calculate_relationships(self) -> Dict[str, List[str]]:
+        """
+        Calculate parent-child counts and identify leaf nodes.
 
-    def _calculate_relationships(self):
-        """Calculate parent-child counts and identify leaf nodes."""
+        Returns:
+            Dictionary mapping parent ID to its child IDs, in traversal order
+        """
         logger.info("Calculating relationships...")
 
-        # Build parent-child map
-        parent_children = {}
+        # Build parent-child map, recording each child's position among its siblings
+        parent_children: Dict[str, List[str]] = {}
+        sibling_positions: Dict[str, int] = {}
         for item in self.all_items:
             parent_id = item.get('parent_id')
             if parent_id:
-                if parent_id not in parent_children:
-                    parent_children[parent_id] = []
-                parent_children[parent_id].append(item['id'])
+                siblings = parent_children.setdefault(parent_id, [])
+                siblings.append(item['id'])
+                sibling_positions[item['id']] = len(siblings)
+
+        # Count descendants bottom-up: children always come after their parent
+        # in all_items, so reverse order sees every child before its parent
+        descendant_counts: Dict[str, int] = {}
+        for item in reversed(self.all_items):
+            children = parent_children.get(item['id'], [])
+            descendant_counts[item['id']] = len(children) + sum(
+                descendant_counts[child_id] for child_id in children
+            )
 
         # Update items with child counts
         for item in self.all_items:
@@ -264,44 +334,32 @@ class HierarchyBuilder:
 
             item['child_count'] = len(children)
             item['is_leaf'] = 1 if len(children) == 0 else 0
+            item['descendant_count'] = descendant_counts[item_id]
+            item['sibling_position'] = sibling_positions.get(item_id, 1)
 
-            # Calculate descendant count recursively
-            item['descendant_count'] = self._count_descendants(item_id, parent_children)
-
-            # Calculate sibling position
-            parent_id = item.get('parent_id')
-            if parent_id and parent_id in parent_children:
-                siblings = parent_children[parent_id]
-                item['sibling_position'] = siblings.index(item_id) + 1
-            else:
-                item['sibling_position'] = 1
-
-    def _count_descendants(self, item_id: str, parent_children: Dict[str, List[str]]) -> int:
-        """Recursively count all descendants."""
-        children = parent_children.get(item_id, [])
-        if not children:
-            return 0
+        return parent_children
 
-        count = len(children)
-        for child_id in children:
-            count += self._count_descendants(child_id, parent_children)
+    def _calculate_metrics(self, include_closed: bool, parent_children: Dict[str, List[str]]):
+        """Calculate derived metrics for all items.
 
-        return count
-
-    def _calculate_metrics(self, include_closed: bool):
-        """Calculate derived metrics for all items."""
+        completion_pct is left as None when closed items were filtered out, since
+        the closed children it counts are then missing from the hierarchy.
+        """
         logger.info("Calculating metrics...")
 
         now = datetime.now(timezone.utc)
+        today = now.date()
 
         for item in self.all_items:
-            # Parse dates
+            is_open = item['state'] == 'opened'
+
+            # Parse dates, skipping those no metric below would use
             created_at = self._parse_datetime(item.get('created_at'))
-            closed_at = self._parse_datetime(item.get('closed_at'))
-            due_date = self._parse_date(item.get('due_date'))
+            closed_at = self._parse_datetime(item.get('closed_at')) if created_at else None
+            due_date = self._parse_date(item.get('due_date')) if is_open else None
 
             # Calculate days open
-            if item['state'] == 'opened' and created_at:
+            if is_open and created_at:
                 item['days_open'] = (now - created_at).days
             else:
                 item['days_open'] = None
@@ -313,10 +371,10 @@ class HierarchyBuilder:
                 item['days_to_close'] = None
 
             # Calculate overdue
-            if due_date and item['state'] == 'opened':
-                item['is_overdue'] = 1 if due_date < now.date() else 0
+            if due_date:
+                item['is_overdue'] = 1 if due_date < today else 0
                 if item['is_overdue']:
-                    item['days_overdue'] = (now.date() - due_date).days
+                    item['days_overdue'] = (today - due_date).days
                 else:
                     item['days_overdue'] = None
             else:
@@ -324,11 +382,11 @@ class HierarchyBuilder:
                 item['days_overdue'] = None
 
             # Calculate completion percentage for epics with children
-            if item['type'] == 'epic' and item['child_count'] > 0:
+            if include_closed and item['type'] == 'epic' and item['child_count'] > 0:
                 # Count closed children
                 closed_children = sum(
-                    1 for child in self.all_items
-                    if child.get('parent_id') == item['id'] and child['state'] == 'closed'
+                    1 for child_id in parent_children[item['id']]
+                    if self.items_by_id[child_id]['state'] == 'closed'
                 )
                 item['completion_pct'] = round(100.0 * closed_children / item['child_count'], 2)
             else:
@@ -339,19 +397,13 @@ class HierarchyBuilder:
         if not dt_str:
             return None
         try:
-            # Handle both with and without milliseconds
-            if '.' in dt_str:
-                return datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
-            else:
-                return datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
+            # fromisoformat only accepts a 'Z' suffix from Python 3.11 on
+            return datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
         except Exception:
             return None
 
-    def _parse_date(self, date_str: Optional[str]) -> Optional[datetime.date]:
+    def _parse_date(self, date_str: Optional[str]) -> Optional[date]:
         """Parse ISO date string."""
         if not date_str:
             return None
-        try:
-            return datetime.fromisoformat(date_str).date()
-        except Exception:
-            return None
+        return _parse_iso_date(date_str)
@@ -2,12 +2,23 @@
 Label parsing and normalization logic.
 """
 
+import json
 import logging
 import re
-from typing import Dict, List, Optional, Set
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Pattern for "category:value" / "category-value" labels outside the known prefixes
+_CUSTOM_LABEL_RE = re.compile(r'^([a-zA-Z0-9_]+)[:-](.+)$')
+
+# Columns for custom category labels, filled in order
+_CUSTOM_KEYS = ('label_custom_1', 'label_custom_2', 'label_custom_3')
+
+# Distinct labels remembered per parser; bounds memory for long-lived parsers
+_LABEL_CACHE_SIZE = 4096
+
 
 class LabelParser:
     """Parse and normalize GitLab labels into structured columns."""
@@ -28,8 +39,33 @@ class LabelParser:
             {'prefix': 'component', 'column': 'label_component'},
         ]
 
+        self._compile_patterns()
+
         # Track custom label categories found
         self.custom_categories: Set[str] = set()
+        # Snapshot handed out by get_discovered_categories; reset on new categories
+        self._categories_snapshot: Optional[FrozenSet[str]] = None
+
+    def _compile_patterns(self):
+        """Rebuild lookup structures derived from the current patterns."""
+        # One alternation over all prefixes; each alternative captures its value
+        # in its own named group, so match.lastgroup identifies the pattern.
+        # Alternatives are tried in order, so the first listed pattern wins.
+        self._group_columns = {}
+        alternatives = []
+        for index, pattern in enumerate(self.patterns):
+            group = f"p{index}"
+            self._group_columns[group] = pattern['column']
+            alternatives.append(f"{re.escape(pattern['prefix'])}[:-](?P<{group}>.+)")
+        self._combined = re.compile(f"^(?:{'|'.join(alternatives)})$", re.IGNORECASE)
+
+        # Per-label parse results; projects reuse a small label vocabulary heavily
+        self._classify_cached = lru_cache(maxsize=_LABEL_CACHE_SIZE)(self._classify_label)
+
+        # Lowercased "prefix:" / "prefix-" strings for the fast-reject check
+        self._prefix_tuple = tuple(
+            p['prefix'].lower() + sep for p in self.patterns for sep in (':', '-')
+        )
 
     def parse_labels(self, labels: List[str]) -> Dict[str, str]:
         """
@@ -42,65 +78,78 @@ class LabelParser:
             Dictionary with label column values
         """
         result = {
-            'labels_raw': labels,  # Keep original
+            # Keep original, serialized once here as compact JSON for storage
+            'labels_raw': json.dumps(labels, separators=(',', ':')),
         }
 
         # Initialize all known columns to None
         for pattern in self.patterns:
             result[pattern['column']] = None
+        for key in _CUSTOM_KEYS:
+            result[key] = None
+        custom_idx = 0
 
         # Parse each label
         for label in labels:
-            # Try to match against known patterns
-            matched = False
-
-            for pattern in self.patterns:
-                prefix = pattern['prefix']
-                column = pattern['column']
-
-                # Check if label matches pattern "prefix:value" or "prefix-value"
-                match = re.match(f"^{prefix}[:-](.+)$", label, re.IGNORECASE)
-                if match:
-                    value = match.group(1).strip()
-                    # Store value (first match wins)
-                    if not result[column]:
-                        result[column] = value
-                    matched = True
-                    break
-
-            # If no match, check if it's a custom category
-            if not matched:
-                self._extract_custom_category(label, result)
+            column, value = self._classify_cached(label)
+
+            if column:
+                # Store value (first match wins)
+                if not result[column]:
+                    result[column] = value
+            elif value and custom_idx < len(_CUSTOM_KEYS):
+                # Custom categories are stored up to 3
+                result[_CUSTOM_KEYS[custom_idx]] = value
+                custom_idx += 1
 
         return result
 
-    def _extract_custom_category(self, label: str, result: Dict):
+    def _classify_label(self, label: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Work out where a single label's value belongs.
+
+        Args:
+            label: Label string
+
+        Returns:
+            (column, value) for a known pattern, (None, "category:value") for
+            a custom category, or (None, None) for a plain label
+        """
+        # Labels without a known prefix can skip pattern matching entirely
+        if label.lower().startswith(self._prefix_tuple):
+            # Try to match against known patterns
+            match = self._combined.match(label)
+            if match:
+                return self._group_columns[match.lastgroup], match.group(match.lastgroup).strip()
+
+        # If no match, check if it's a custom category
+        return None, self._extract_custom_category(label)
+
+    def _extract_custom_category(self, label: str) -> Optional[str]:
         """
         Extract custom label categories not matching standard patterns.
 
         Args:
             label: Label string
-            result: Result dictionary to update
+
+        Returns:
+            Normalized "category:value" string, or None if label has no category
         """
         # Check if label has "category:value" or "category-value" format
-        match = re.match(r'^([a-zA-Z0-9_]+)[:-](.+)$', label)
+        match = _CUSTOM_LABEL_RE.match(label)
 
-        if match:
-            category = match.group(1).lower()
-            value = match.group(2).strip()
+        if not match:
+            return None
 
-            # Track new categories
-            if category not in self.custom_categories:
-                self.custom_categories.add(category)
-                logger.debug(f"Discovered custom label category: {category}")
+        category, value = match.group(1).lower(), match.group(2).strip()
 
-            # Store in custom columns (up to 3)
-            custom_columns = ['label_custom_1', 'label_custom_2', 'label_custom_3']
+        # Track new categories
+        if category not in self.custom_categories:
+            self.custom_categories.add(category)
+            self._categories_snapshot = None
+            logger.debug(f"Discovered custom label category: {category}")
 
-            for col in custom_columns:
-                if col not in result or result[col] is None:
-                    result[col] = f"{category}:{value}"
-                    break
+        return f"{category}:{value}"
 
     def parse_items(self, items: List[Dict]) -> List[Dict]:
         """
@@ -125,14 +174,16 @@ class LabelParser:
 
         return items
 
-    def get_discovered_categories(self) -> Set[str]:
+    def get_discovered_categories(self) -> FrozenSet[str]:
         """
         Get all custom label categories discovered during parsing.
 
         Returns:
-            Set of category names
+            Frozen set of category names, rebuilt only after new categories appear
         """
-        return self.custom_categories
+        if self._categories_snapshot is None:
+            self._categories_snapshot = frozenset(self.custom_categories)
+        return self._categories_snapshot
 
     def add_pattern(self, prefix: str, column: str):
         """
@@ -143,4 +194,5 @@ class LabelParser:
             column: Column name to store value
         """
         self.patterns.append({'prefix': prefix, 'column': column})
+        self._compile_patterns()
         logger.debug(f"Added label pattern: {prefix} -> {column}")
@@ -27,7 +27,6 @@ CREATE TABLE IF NOT EXISTS gitlab_hierarchy (
 
     -- Core Attributes
     title TEXT NOT NULL,
-    description TEXT,
     state TEXT NOT NULL,
     web_url TEXT,
     author_username TEXT,
@@ -56,7 +55,7 @@ CREATE TABLE IF NOT EXISTS gitlab_hierarchy (
     epic_issue_id INTEGER,
 
     -- Labels (Normalized)
-    labels_raw TEXT,
+    labels_raw TEXT CHECK (labels_raw IS NULL OR json_valid(labels_raw)),
     label_priority TEXT,
     label_type TEXT,
     label_status TEXT,
@@ -87,12 +86,6 @@ CREATE TABLE IF NOT EXISTS gitlab_hierarchy (
     upvotes INTEGER DEFAULT 0,
     downvotes INTEGER DEFAULT 0,
 
-    -- Relationship Fields
-    blocks TEXT,
-    blocked_by TEXT,
-    related_issues TEXT,
-    related_merge_requests TEXT,
-
     -- Snapshot & Versioning
     snapshot_date DATE NOT NULL,
     data_version INTEGER DEFAULT 1,
@@ -101,7 +94,6 @@ CREATE TABLE IF NOT EXISTS gitlab_hierarchy (
     -- Additional Metadata
     has_tasks INTEGER DEFAULT 0,
     task_completion_status TEXT,
-    reference_links TEXT,
     moved_to_id INTEGER,
     duplicated_to_id INTEGER,
     closed_by TEXT,
@@ -111,6 +103,35 @@ CREATE TABLE IF NOT EXISTS gitlab_hierarchy (
 );
 """
 
+# Rarely-read text columns live in a side table keyed by id, so scans and
+# aggregates over gitlab_hierarchy only touch the narrow "hot" rows
+DETAIL_COLUMNS = [
+    'description',
+    'blocks',
+    'blocked_by',
+    'related_issues',
+    'related_merge_requests',
+    'reference_links',
+]
+
+DETAIL_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS gitlab_hierarchy_detail (
+    id TEXT PRIMARY KEY,
+
+    -- Core Attributes
+    description TEXT,
+
+    -- Relationship Fields
+    blocks TEXT,
+    blocked_by TEXT,
+    related_issues TEXT,
+    related_merge_requests TEXT,
+
+    -- Additional Metadata
+    reference_links TEXT
+) WITHOUT ROWID;
+"""
+
 # Indexes for performance
 INDEXES_SQL = [
     "CREATE INDEX IF NOT EXISTS idx_type ON gitlab_hierarchy(type);",
@@ -208,7 +229,7 @@ CREATE TABLE IF NOT EXISTS gitlab_project_issues (
     severity TEXT,
 
     -- Labels (Normalized)
-    labels_raw TEXT,
+    labels_raw TEXT CHECK (labels_raw IS NULL OR json_valid(labels_raw)),
     label_priority TEXT,
     label_type TEXT,
     label_status TEXT,
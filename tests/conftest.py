@@ -3,22 +3,15 @@ Shared pytest fixtures for gitlab_hierarchy tests.
 """
 
 import pytest
-import tempfile
-from pathlib import Path
 from unittest.mock import Mock
 from datetime import datetime, date
 
 
 @pytest.fixture
-def temp_db_path():
+def temp_db_path(tmp_path):
     """Create a temporary database file path."""
-    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
-        db_path = f.name
-
-    yield db_path
-
-    # Cleanup
-    Path(db_path).unlink(missing_ok=True)
+    # pytest removes tmp_path itself, so no cleanup is needed
+    return str(tmp_path / "test.db")
 
 
 @pytest.fixture
@@ -263,12 +256,3 @@ def sample_snapshot_date():
     """Sample snapshot date for testing."""
     return date(2024, 1, 15)
 
-
-# Markers for test categorization
-def pytest_configure(config):
-    """Configure custom pytest markers."""
-    config.addinivalue_line("markers", "unit: Unit tests")
-    config.addinivalue_line("markers", "integration: Integration tests")
-    config.addinivalue_line("markers", "database: Database tests")
-    config.addinivalue_line("markers", "api: API-related tests")
-    config.addinivalue_line("markers", "slow: Slow-running tests")
@@ -2,25 +2,35 @@
 Tests for database operations.
 """
 
+import sqlite3
 import pytest
-import tempfile
-from pathlib import Path
 from datetime import date
 
 from gitlab_hierarchy.database import Database
+from gitlab_hierarchy.models import SCHEMA_SQL
 
 
-@pytest.fixture
-def temp_db():
-    """Create a temporary database for testing."""
-    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
-        db_path = f.name
-
-    db = Database(db_path)
+@pytest.fixture(scope="session")
+def _schema_db():
+    """Create a single in-memory database, paying schema setup once per session."""
+    db = Database(":memory:")
     yield db
-
     db.close()
-    Path(db_path).unlink(missing_ok=True)
+
+
+@pytest.fixture
+def temp_db(_schema_db):
+    """Provide the shared database, wiping all rows after each test."""
+    yield _schema_db
+
+    # Database methods commit after each write, so a savepoint rollback
+    # would not isolate tests; empty the tables instead.
+    conn = _schema_db.conn
+    conn.rollback()
+    tables = conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+    for (table,) in tables:
+        conn.execute(f"DELETE FROM {table}")
+    conn.commit()
 
 
 def test_database_initialization(temp_db):
@@ -57,6 +67,35 @@ def test_insert_item(temp_db):
     assert retrieved['type'] == 'epic'
 
 
+def test_insert_item_detail(temp_db):
+    """Test that detail columns are stored in the side table."""
+    item = {
+        'id': 'issue:456#1',
+        'type': 'issue',
+        'iid': 1,
+        'project_id': 456,
+        'title': 'Test Issue',
+        'description': 'Long description',
+        'blocks': ['issue:456#2'],
+        'state': 'opened',
+        'root_id': 'epic:123#10',
+        'depth': 1,
+        'created_at': '2024-01-01T00:00:00Z',
+        'updated_at': '2024-01-01T00:00:00Z',
+    }
+
+    temp_db.insert_item(item, date(2024, 1, 1))
+
+    # Detail columns are not part of the narrow row
+    retrieved = temp_db.get_item('issue:456#1')
+    assert 'description' not in retrieved
+
+    retrieved = temp_db.get_item('issue:456#1', include_detail=True)
+    assert retrieved['title'] == 'Test Issue'
+    assert retrieved['description'] == 'Long description'
+    assert retrieved['blocks'] == '["issue:456#2"]'
+
+
 def test_get_children(temp_db):
     """Test retrieving child items."""
     # Insert parent
@@ -195,3 +234,45 @@ def test_cleanup_old_snapshots(temp_db):
     # New snapshot should remain
     latest = temp_db.get_item('epic:123#10', latest_only=True)
     assert latest['title'] == 'New Snapshot'
+
+
+def test_uri_db_path(tmp_path):
+    """Test that a file: URI with an authority is passed to SQLite unchanged."""
+    uri = f"file://localhost{tmp_path}/uri.db?mode=rwc"
+
+    db = Database(uri)
+    try:
+        assert db.db_path == uri
+        assert (tmp_path / 'uri.db').exists()
+    finally:
+        db.close()
+
+
+def test_migrate_detail_columns(temp_db_path):
+    """Test that an older wide table has its detail columns moved to the side table."""
+    # Recreate the pre-detail-table layout with description/blocks inline
+    legacy_sql = SCHEMA_SQL.replace(
+        "id TEXT PRIMARY KEY,", "id TEXT PRIMARY KEY,\n    description TEXT,\n    blocks TEXT,", 1
+    )
+    conn = sqlite3.connect(temp_db_path)
+    conn.execute(legacy_sql)
+    conn.execute(
+        "INSERT INTO gitlab_hierarchy (id, type, iid, title, state, root_id, depth, "
+        "created_at, updated_at, snapshot_date, description, blocks) "
+        "VALUES ('issue:456#1', 'issue', 1, 'Old Issue', 'opened', 'epic:123#10', 1, "
+        "'2024-01-01', '2024-01-01', '2024-01-01', 'Old description', '[\"issue:456#2\"]')"
+    )
+    conn.commit()
+    conn.close()
+
+    db = Database(temp_db_path)
+    try:
+        columns = [row[1] for row in db.conn.execute("PRAGMA table_info(gitlab_hierarchy)")]
+        assert 'description' not in columns
+
+        retrieved = db.get_item('issue:456#1', include_detail=True)
+        assert retrieved['title'] == 'Old Issue'
+        assert retrieved['description'] == 'Old description'
+        assert retrieved['blocks'] == '["issue:456#2"]'
+    finally:
+        db.close()
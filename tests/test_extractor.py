@@ -3,122 +3,159 @@ Tests for the main HierarchyExtractor orchestrator.
 """
 
 import pytest
-import tempfile
-from pathlib import Path
-from unittest.mock import Mock, MagicMock, patch
+from uuid import uuid4
+from unittest.mock import DEFAULT, Mock, MagicMock, patch
 from datetime import date
+import sqlite3
 
+from gitlab_hierarchy.database import Database
 from gitlab_hierarchy.extractor import HierarchyExtractor
 
 
+# Shared hierarchy data; tests insert copies since the database layer mutates items
+ROOT_EPIC_ITEM = {
+    'id': 'epic:123#1',
+    'type': 'epic',
+    'iid': 1,
+    'group_id': 123,
+    'title': 'Root Epic',
+    'state': 'opened',
+    'root_id': 'epic:123#1',
+    'depth': 0,
+    'labels_raw': ['priority:high'],
+    'created_at': '2024-01-01T00:00:00Z',
+    'updated_at': '2024-01-01T00:00:00Z',
+}
+
+CHILD_ISSUE_ITEM = {
+    'id': 'issue:456#1',
+    'type': 'issue',
+    'iid': 1,
+    'project_id': 456,
+    'title': 'Child Issue',
+    'state': 'opened',
+    'root_id': 'epic:123#1',
+    'parent_id': 'epic:123#1',
+    'depth': 1,
+    'labels_raw': ['bug'],
+    'created_at': '2024-01-01T00:00:00Z',
+    'updated_at': '2024-01-01T00:00:00Z',
+}
+
+_EMPTY: tuple = ()
+_SINGLE_EPIC = (ROOT_EPIC_ITEM,)
+
+
+@pytest.fixture(scope="module")
+def _memory_db():
+    """Create a shared in-memory database, kept open so its schema outlives each test."""
+    db = Database(f"file:test_{uuid4().hex}?mode=memory&cache=shared")
+    yield db
+    db.close()
+
+
 @pytest.fixture
-def temp_db():
-    """Create a temporary database for testing."""
-    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
-        db_path = f.name
+def temp_db(_memory_db):
+    """Provide the shared in-memory database URI, emptying its tables after each test."""
+    yield str(_memory_db.db_path)
+
+    conn = _memory_db.conn
+    tables = conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+    for (table,) in tables:
+        conn.execute(f"DELETE FROM {table}")
+    conn.commit()
+
+
+@pytest.fixture(scope="module")
+def mock_components():
+    """Create mocked components, patched once for the whole module."""
+    with patch.multiple(
+        'gitlab_hierarchy.extractor',
+        GitLabClient=DEFAULT,
+        HierarchyBuilder=DEFAULT,
+        LabelParser=DEFAULT
+    ) as mocks:
+        mocks['GitLabClient'].return_value = Mock()
+        mocks['HierarchyBuilder'].return_value = Mock()
+        mocks['LabelParser'].return_value = Mock()
+
+        yield {
+            'client': mocks['GitLabClient'].return_value,
+            'builder': mocks['HierarchyBuilder'].return_value,
+            'parser': mocks['LabelParser'].return_value
+        }
 
-    yield db_path
 
-    # Cleanup
-    Path(db_path).unlink(missing_ok=True)
+@pytest.fixture(scope="module")
+def shared_extractor(_memory_db, mock_components):
+    """Create one extractor for read-only tests in the module."""
+    extractor = HierarchyExtractor(
+        gitlab_url='https://gitlab.example.com',
+        token='test-token',
+        db_path=str(_memory_db.db_path)
+    )
+    yield extractor
+    extractor.close()
 
 
 @pytest.fixture
-def mock_components():
-    """Create mocked components."""
-    with patch('gitlab_hierarchy.extractor.GitLabClient') as mock_client_class, \
-         patch('gitlab_hierarchy.extractor.HierarchyBuilder') as mock_builder_class, \
-         patch('gitlab_hierarchy.extractor.LabelParser') as mock_parser_class:
+def extractor(temp_db, mock_components):
+    """Create an extractor on the test database, closing it after the test."""
+    extractor = HierarchyExtractor(
+        gitlab_url='https://gitlab.example.com',
+        token='test-token',
+        db_path=temp_db
+    )
+    yield extractor
+    extractor.close()
 
-        mock_client = Mock()
-        mock_builder = Mock()
-        mock_parser = Mock()
 
-        mock_client_class.return_value = mock_client
-        mock_builder_class.return_value = mock_builder
-        mock_parser_class.return_value = mock_parser
+@pytest.fixture
+def quiet_tqdm(monkeypatch):
+    """Replace the extractor's tqdm progress bar with a pass-through."""
+    monkeypatch.setattr('gitlab_hierarchy.extractor.tqdm', lambda iterable, *args, **kwargs: iterable)
 
-        yield {
-            'client': mock_client,
-            'builder': mock_builder,
-            'parser': mock_parser
-        }
 
+@pytest.fixture(scope="module")
+def basic_hierarchy():
+    """Root epic with a single child issue."""
+    return (ROOT_EPIC_ITEM, CHILD_ISSUE_ITEM)
 
-def test_extractor_initialization(temp_db, mock_components):
-    """Test extractor initialization."""
-    with patch.dict('os.environ', {'GITLAB_TOKEN': 'test-token'}):
-        extractor = HierarchyExtractor(
-            gitlab_url='https://gitlab.example.com',
-            db_path=temp_db
-        )
 
-    assert extractor is not None
-    assert extractor.db is not None
-    assert extractor.client is not None
+@pytest.fixture(autouse=True)
+def _reset_components(mock_components):
+    """Clear calls and configured behavior on the shared mocks before each test."""
+    for mock in mock_components.values():
+        mock.reset_mock(return_value=True, side_effect=True)
+    mock_components['parser'].get_discovered_categories.return_value = frozenset()
+
+
+def test_extractor_initialization(shared_extractor):
+    """Test extractor initialization."""
+    assert shared_extractor is not None
+    assert shared_extractor.db is not None
+    assert shared_extractor.client is not None
 
 
-def test_extract_basic_hierarchy(temp_db, mock_components):
+def test_extract_basic_hierarchy(extractor, mock_components, basic_hierarchy):
     """Test basic extraction workflow."""
     mock_builder = mock_components['builder']
     mock_parser = mock_components['parser']
 
     # Mock hierarchy data
-    hierarchy_items = [
-        {
-            'id': 'epic:123#1',
-            'type': 'epic',
-            'iid': 1,
-            'group_id': 123,
-            'title': 'Root Epic',
-            'state': 'opened',
-            'root_id': 'epic:123#1',
-            'depth': 0,
-            'labels': ['priority:high'],
-            'created_at': '2024-01-01T00:00:00Z',
-            'updated_at': '2024-01-01T00:00:00Z',
-        },
-        {
-            'id': 'issue:456#1',
-            'type': 'issue',
-            'iid': 1,
-            'project_id': 456,
-            'title': 'Child Issue',
-            'state': 'opened',
-            'root_id': 'epic:123#1',
-            'parent_id': 'epic:123#1',
-            'depth': 1,
-            'labels': ['bug'],
-            'created_at': '2024-01-01T00:00:00Z',
-            'updated_at': '2024-01-01T00:00:00Z',
-        }
-    ]
+    hierarchy_items = [dict(item) for item in basic_hierarchy]
 
     # Mock the hierarchy builder to return our test data
-    mock_builder.build_from_epic.return_value = hierarchy_items
-
-    # Mock label parser to add label fields
-    def parse_items_side_effect(items):
-        for item in items:
-            if 'priority:high' in item.get('labels', []):
-                item['label_priority'] = 'high'
-            if 'bug' in item.get('labels', []):
-                item['label_type'] = 'bug'
-        return items
-
-    mock_parser.parse_items.side_effect = parse_items_side_effect
+    mock_builder.build_from_groups.return_value = hierarchy_items
 
-    with patch.dict('os.environ', {'GITLAB_TOKEN': 'test-token'}):
-        extractor = HierarchyExtractor(
-            gitlab_url='https://gitlab.example.com',
-            db_path=temp_db
-        )
+    mock_parser.parse_items.return_value = hierarchy_items
 
-        stats = extractor.extract(
-            group_id=123,
-            epic_iid=1,
-            snapshot_date=date(2024, 1, 1)
-        )
+    stats = extractor.extract_from_groups(
+        group_ids=[123],
+        root_group_id=123,
+        root_epic_iid=1,
+        snapshot_date=date(2024, 1, 1)
+    )
 
     # Verify extraction stats
     assert stats is not None
@@ -127,259 +164,188 @@ def test_extract_basic_hierarchy(temp_db, mock_components):
     assert stats['issue_count'] == 1
 
     # Verify builder was called correctly
-    mock_builder.build_from_epic.assert_called_once_with(
-        group_id=123,
-        epic_iid=1,
-        max_depth=10,
-        include_closed=True
+    mock_builder.build_from_groups.assert_called_once_with(
+        group_ids=[123],
+        root_group_id=123,
+        root_epic_iid=1,
+        max_depth=20,
+        include_closed=True,
+        use_graphql=False
     )
 
     # Verify parser was called
     mock_parser.parse_items.assert_called_once()
 
-    extractor.close()
-
 
-def test_extract_with_options(temp_db, mock_components):
-    """Test extraction with various options."""
+@pytest.mark.parametrize(
+    "items,extract_kwargs,build_kwargs,expected_counts",
+    [
+        (
+            _SINGLE_EPIC,
+            {'max_depth': 5, 'include_closed': False, 'snapshot_date': date(2024, 1, 15)},
+            {'max_depth': 5, 'include_closed': False, 'use_graphql': False},
+            (1, 1, 0),
+        ),
+        (
+            _EMPTY,
+            {},
+            {'max_depth': 20, 'include_closed': True, 'use_graphql': False},
+            (0, 0, 0),
+        ),
+    ],
+    ids=['with_options', 'empty_hierarchy'],
+)
+def test_extract_variants(extractor, mock_components, items, extract_kwargs, build_kwargs, expected_counts):
+    """Test extraction options and resulting counts."""
     mock_builder = mock_components['builder']
     mock_parser = mock_components['parser']
 
-    hierarchy_items = [
-        {
-            'id': 'epic:123#1',
-            'type': 'epic',
-            'iid': 1,
-            'group_id': 123,
-            'title': 'Root Epic',
-            'state': 'opened',
-            'root_id': 'epic:123#1',
-            'depth': 0,
-            'labels': [],
-            'created_at': '2024-01-01T00:00:00Z',
-            'updated_at': '2024-01-01T00:00:00Z',
-        }
-    ]
+    hierarchy_items = [dict(item) for item in items]
 
-    mock_builder.build_from_epic.return_value = hierarchy_items
+    mock_builder.build_from_groups.return_value = hierarchy_items
     mock_parser.parse_items.return_value = hierarchy_items
 
-    with patch.dict('os.environ', {'GITLAB_TOKEN': 'test-token'}):
-        extractor = HierarchyExtractor(
-            gitlab_url='https://gitlab.example.com',
-            db_path=temp_db
-        )
-
-        stats = extractor.extract(
-            group_id=123,
-            epic_iid=1,
-            max_depth=5,
-            include_closed=False,
-            snapshot_date=date(2024, 1, 15)
-        )
+    stats = extractor.extract_from_groups(
+        group_ids=[123], root_group_id=123, root_epic_iid=1, **extract_kwargs
+    )
 
     # Verify builder was called with correct options
-    mock_builder.build_from_epic.assert_called_once_with(
-        group_id=123,
-        epic_iid=1,
-        max_depth=5,
-        include_closed=False
+    mock_builder.build_from_groups.assert_called_once_with(
+        group_ids=[123],
+        root_group_id=123,
+        root_epic_iid=1,
+        **build_kwargs
     )
 
-    assert stats['total_items'] == 1
-
-    extractor.close()
+    total_items, epic_count, issue_count = expected_counts
+    assert stats['total_items'] == total_items
+    assert stats['epic_count'] == epic_count
+    assert stats['issue_count'] == issue_count
 
 
-def test_extract_empty_hierarchy(temp_db, mock_components):
-    """Test extraction when no items are found."""
-    mock_builder = mock_components['builder']
-    mock_parser = mock_components['parser']
-
-    # Return empty hierarchy
-    mock_builder.build_from_epic.return_value = []
-    mock_parser.parse_items.return_value = []
-
-    with patch.dict('os.environ', {'GITLAB_TOKEN': 'test-token'}):
-        extractor = HierarchyExtractor(
-            gitlab_url='https://gitlab.example.com',
-            db_path=temp_db
-        )
-
-        stats = extractor.extract(group_id=123, epic_iid=1)
-
-    assert stats['total_items'] == 0
-    assert stats['epic_count'] == 0
-    assert stats['issue_count'] == 0
-
-    extractor.close()
-
-
-def test_get_stats(temp_db, mock_components):
+def test_get_stats(extractor, mock_components):
     """Test getting statistics from database."""
     mock_builder = mock_components['builder']
     mock_parser = mock_components['parser']
 
-    hierarchy_items = [
-        {
-            'id': 'epic:123#1',
-            'type': 'epic',
-            'iid': 1,
-            'group_id': 123,
-            'title': 'Root Epic',
-            'state': 'opened',
-            'root_id': 'epic:123#1',
-            'depth': 0,
-            'labels': [],
-            'created_at': '2024-01-01T00:00:00Z',
-            'updated_at': '2024-01-01T00:00:00Z',
-        }
-    ]
+    hierarchy_items = [dict(ROOT_EPIC_ITEM)]
 
-    mock_builder.build_from_epic.return_value = hierarchy_items
+    mock_builder.build_from_groups.return_value = hierarchy_items
     mock_parser.parse_items.return_value = hierarchy_items
 
-    with patch.dict('os.environ', {'GITLAB_TOKEN': 'test-token'}):
-        extractor = HierarchyExtractor(
-            gitlab_url='https://gitlab.example.com',
-            db_path=temp_db
-        )
-
-        # First extract some data
-        extractor.extract(group_id=123, epic_iid=1)
+    # First extract some data
+    extractor.extract_from_groups(group_ids=[123], root_group_id=123, root_epic_iid=1)
 
-        # Then get stats
-        stats = extractor.get_stats(root_id='epic:123#1')
+    # Then get stats
+    stats = extractor.get_stats(root_id='epic:123#1')
 
     assert stats is not None
     assert 'total_items' in stats
     assert stats['total_items'] > 0
 
-    extractor.close()
 
-
-def test_cleanup_old_snapshots(temp_db, mock_components):
+def test_cleanup_old_snapshots(extractor, mock_components):
     """Test cleanup of old snapshot data."""
     mock_builder = mock_components['builder']
     mock_parser = mock_components['parser']
 
-    hierarchy_items = [
-        {
-            'id': 'epic:123#1',
-            'type': 'epic',
-            'iid': 1,
-            'group_id': 123,
-            'title': 'Root Epic',
-            'state': 'opened',
-            'root_id': 'epic:123#1',
-            'depth': 0,
-            'labels': [],
-            'created_at': '2024-01-01T00:00:00Z',
-            'updated_at': '2024-01-01T00:00:00Z',
-        }
-    ]
+    hierarchy_items = [dict(ROOT_EPIC_ITEM)]
 
-    mock_builder.build_from_epic.return_value = hierarchy_items
+    mock_builder.build_from_groups.return_value = hierarchy_items
     mock_parser.parse_items.return_value = hierarchy_items
 
-    with patch.dict('os.environ', {'GITLAB_TOKEN': 'test-token'}):
-        extractor = HierarchyExtractor(
-            gitlab_url='https://gitlab.example.com',
-            db_path=temp_db
-        )
-
-        # Extract old snapshot
-        extractor.extract(
-            group_id=123,
-            epic_iid=1,
-            snapshot_date=date(2020, 1, 1)
-        )
+    # Extract old snapshot
+    extractor.extract_from_groups(
+        group_ids=[123],
+        root_group_id=123,
+        root_epic_iid=1,
+        snapshot_date=date(2020, 1, 1)
+    )
 
-        # Mark as not latest
-        extractor.db.mark_old_snapshots_not_latest('epic:123#1')
+    # Mark as not latest
+    extractor.db.mark_old_snapshots_not_latest('epic:123#1')
 
-        # Extract new snapshot
-        extractor.extract(
-            group_id=123,
-            epic_iid=1,
-            snapshot_date=date.today()
-        )
+    # Extract new snapshot
+    extractor.extract_from_groups(
+        group_ids=[123],
+        root_group_id=123,
+        root_epic_iid=1,
+        snapshot_date=date.today()
+    )
 
-        # Cleanup old snapshots
-        deleted = extractor.cleanup_old_snapshots(keep_days=30)
+    # Cleanup old snapshots
+    deleted = extractor.cleanup_old_snapshots(keep_days=30)
 
     # Should have deleted the old snapshot
     assert deleted >= 0
 
-    extractor.close()
+
+def test_extract_empty_hierarchy(extractor, mock_components, caplog):
+    """Test that an extraction finding no items still summarizes and reports zeroes."""
+    mock_components['builder'].build_from_groups.return_value = []
+    mock_components['parser'].parse_items.return_value = []
+
+    with caplog.at_level('INFO', logger='gitlab_hierarchy.extractor'):
+        stats = extractor.extract_from_groups(group_ids=[123], root_group_id=123, root_epic_iid=1)
+
+    assert stats['success'] is True
+    assert stats['total_items'] == 0
+    assert stats['open_count'] == 0
+    assert stats['closed_count'] == 0
+    # Depth aggregates are NULL for an empty snapshot and are reported as 0
+    assert stats['max_depth'] == 0
+    assert stats['avg_depth'] == 0
+    assert 'Open: 0' in caplog.text
 
 
 def test_context_manager(temp_db, mock_components):
     """Test using extractor as context manager."""
     mock_builder = mock_components['builder']
-    mock_builder.build_from_epic.return_value = []
+    mock_builder.build_from_groups.return_value = _EMPTY
 
     mock_parser = mock_components['parser']
-    mock_parser.parse_items.return_value = []
+    mock_parser.parse_items.return_value = _EMPTY
 
-    with patch.dict('os.environ', {'GITLAB_TOKEN': 'test-token'}):
-        with HierarchyExtractor(
-            gitlab_url='https://gitlab.example.com',
-            db_path=temp_db
-        ) as extractor:
-            stats = extractor.extract(group_id=123, epic_iid=1)
+    with HierarchyExtractor(
+        gitlab_url='https://gitlab.example.com',
+        token='test-token',
+        db_path=temp_db
+    ) as extractor:
+        stats = extractor.extract_from_groups(group_ids=[123], root_group_id=123, root_epic_iid=1)
 
-        # Should have closed connections automatically
-        assert extractor.db.conn is None
+    assert stats['total_items'] == 0
 
+    # Should have closed connections automatically
+    with pytest.raises(sqlite3.ProgrammingError):
+        extractor.db.conn.execute("SELECT 1")
 
-def test_verbose_output(temp_db, mock_components):
+
+def test_verbose_output(extractor, mock_components, quiet_tqdm):
     """Test verbose output during extraction."""
     mock_builder = mock_components['builder']
     mock_parser = mock_components['parser']
 
-    hierarchy_items = [
-        {
-            'id': 'epic:123#1',
-            'type': 'epic',
-            'iid': 1,
-            'group_id': 123,
-            'title': 'Root Epic',
-            'state': 'opened',
-            'root_id': 'epic:123#1',
-            'depth': 0,
-            'labels': [],
-            'created_at': '2024-01-01T00:00:00Z',
-            'updated_at': '2024-01-01T00:00:00Z',
-        }
-    ]
+    hierarchy_items = [dict(ROOT_EPIC_ITEM)]
 
-    mock_builder.build_from_epic.return_value = hierarchy_items
+    mock_builder.build_from_groups.return_value = hierarchy_items
     mock_parser.parse_items.return_value = hierarchy_items
 
-    with patch.dict('os.environ', {'GITLAB_TOKEN': 'test-token'}):
-        extractor = HierarchyExtractor(
-            gitlab_url='https://gitlab.example.com',
-            db_path=temp_db
-        )
-
-        # Extract with verbose=True
-        with patch('tqdm.tqdm') as mock_tqdm:
-            stats = extractor.extract(
-                group_id=123,
-                epic_iid=1,
-                verbose=True
-            )
-
-        # tqdm should have been used for progress tracking
-        # (In real implementation, this would be called)
+    # Extract with verbose=True
+    stats = extractor.extract_from_groups(
+        group_ids=[123],
+        root_group_id=123,
+        root_epic_iid=1,
+        verbose=True
+    )
 
-    extractor.close()
+    assert stats['total_items'] == 1
 
 
-def test_custom_label_patterns(temp_db, mock_components):
+def test_custom_label_patterns(mock_components):
     """Test extractor with custom label patterns."""
-    with patch.dict('os.environ', {'GITLAB_TOKEN': 'test-token'}):
+    with patch('gitlab_hierarchy.extractor.Database') as mock_db_class:
+        mock_db_class.return_value = Mock()
+
         custom_patterns = {
             'severity': 'label_severity',
             'area': 'label_area'
@@ -387,7 +353,8 @@ def test_custom_label_patterns(temp_db, mock_components):
 
         extractor = HierarchyExtractor(
             gitlab_url='https://gitlab.example.com',
-            db_path=temp_db,
+            token='test-token',
+            db_path='test.db',
             label_patterns=custom_patterns
         )
 
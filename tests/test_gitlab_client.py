@@ -2,74 +2,123 @@
 Tests for GitLab client wrapper.
 """
 
+import gitlab
 import pytest
-from unittest.mock import Mock, MagicMock, patch
-from gitlab_hierarchy.gitlab_client import GitLabClient
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+from gitlab_hierarchy.gitlab_client import GitLabClient, PER_PAGE
+
+
+EPIC_DEFAULTS = dict(
+    iid=10,
+    id='gid://gitlab/Epic/123',
+    title='Test Epic',
+    state='opened',
+    labels=[],
+    web_url='https://gitlab.example.com/groups/test/-/epics/10',
+    created_at='2024-01-01T00:00:00Z',
+    updated_at='2024-01-01T00:00:00Z',
+    start_date=None,
+    end_date=None,
+    parent_id=None,
+)
+
+ISSUE_DEFAULTS = dict(
+    iid=1,
+    id=456,
+    project_id=789,
+    title='Test Issue',
+    state='opened',
+    labels=[],
+    web_url='https://gitlab.example.com/project/repo/-/issues/1',
+    created_at='2024-01-01T00:00:00Z',
+    updated_at='2024-01-01T00:00:00Z',
+    closed_at=None,
+    due_date=None,
+)
+
+
+def make_epic(**overrides):
+    """Create a plain GitLab epic stand-in, overriding default attributes."""
+    return SimpleNamespace(**{**EPIC_DEFAULTS, **overrides})
+
+
+def make_issue(**overrides):
+    """Create a plain GitLab issue stand-in, overriding default attributes."""
+    return SimpleNamespace(**{**ISSUE_DEFAULTS, **overrides})
+
+
+@pytest.fixture(autouse=True)
+def _no_sleep():
+    """Make rate-limit sleeps in the client module no-ops."""
+    # Patch the client's reference to the time module so other modules keep real sleeps
+    with patch('gitlab_hierarchy.gitlab_client.time') as mock_time:
+        yield mock_time.sleep
+
+
+@pytest.fixture(scope="module")
+def _gitlab_patch():
+    """Patch the python-gitlab client class once for the whole module."""
+    # Module rather than session scope, so the patch never leaks into other test modules
+    with patch('gitlab_hierarchy.gitlab_client.gitlab.Gitlab') as mock_gl:
+        yield mock_gl
 
 
 @pytest.fixture
-def mock_gitlab():
+def mock_gitlab(_gitlab_patch):
     """Create a mock GitLab instance."""
-    with patch('gitlab_hierarchy.gitlab_client.gitlab.Gitlab') as mock_gl:
-        instance = Mock()
-        mock_gl.return_value = instance
-        yield instance
+    instance = Mock()
+    _gitlab_patch.return_value = instance
+    yield instance
+    _gitlab_patch.reset_mock()
 
 
 @pytest.fixture
 def client(mock_gitlab):
     """Create a GitLabClient with mocked gitlab library."""
-    with patch.dict('os.environ', {'GITLAB_TOKEN': 'test-token'}):
-        return GitLabClient(gitlab_url='https://gitlab.example.com')
-
-
-def test_client_initialization(mock_gitlab):
-    """Test client initialization with various auth methods."""
-    # Test with token from parameter
-    with patch.dict('os.environ', clear=True):
-        client = GitLabClient(
-            gitlab_url='https://gitlab.example.com',
-            token='param-token'
-        )
-    mock_gitlab.assert_called_with(
-        'https://gitlab.example.com',
-        private_token='param-token'
-    )
+    return GitLabClient(gitlab_url='https://gitlab.example.com', token='test-token')
+
+
+@pytest.fixture
+def gl_world(mock_gitlab):
+    """Wire a group/epic and project/issue pair into the mocked GitLab instance."""
+    group = Mock()
+    project = Mock()
+
+    # Mocks rather than plain stand-ins, since tests configure epic.issues / issue.links
+    epic = Mock(**EPIC_DEFAULTS)
+    issue = Mock(**ISSUE_DEFAULTS)
+
+    mock_gitlab.groups.get.return_value = group
+    mock_gitlab.projects.get.return_value = project
+    group.epics.get.return_value = epic
+    project.issues.get.return_value = issue
+
+    return SimpleNamespace(group=group, epic=epic, project=project, issue=issue)
+
 
-    # Test with token from environment
-    with patch.dict('os.environ', {'GITLAB_TOKEN': 'env-token'}):
-        client = GitLabClient(gitlab_url='https://gitlab.example.com')
-    mock_gitlab.assert_called_with(
-        'https://gitlab.example.com',
-        private_token='env-token'
+def test_client_initialization(_gitlab_patch, mock_gitlab):
+    """Test that the client authenticates with the given token."""
+    GitLabClient(gitlab_url='https://gitlab.example.com', token='param-token')
+
+    _gitlab_patch.assert_called_with(
+        url='https://gitlab.example.com',
+        private_token='param-token',
+        timeout=30
     )
+    mock_gitlab.auth.assert_called_once_with()
 
 
 def test_client_initialization_no_token(mock_gitlab):
-    """Test that missing token raises error."""
-    with patch.dict('os.environ', clear=True):
-        with pytest.raises(ValueError, match='GitLab token is required'):
-            GitLabClient(gitlab_url='https://gitlab.example.com')
+    """Test that the token is a required argument."""
+    # The client never reads GITLAB_TOKEN; only the CLI falls back to it
+    with pytest.raises(TypeError, match='token'):
+        GitLabClient(gitlab_url='https://gitlab.example.com')
 
 
-def test_get_epic(client, mock_gitlab):
+def test_get_epic(client, gl_world):
     """Test fetching a single epic."""
-    mock_group = Mock()
-    mock_epic = Mock()
-    mock_epic.iid = 10
-    mock_epic.id = 'gid://gitlab/Epic/123'
-    mock_epic.title = 'Test Epic'
-    mock_epic.state = 'opened'
-    mock_epic.labels = ['priority:high', 'type:epic']
-    mock_epic.web_url = 'https://gitlab.example.com/groups/test/-/epics/10'
-    mock_epic.created_at = '2024-01-01T00:00:00Z'
-    mock_epic.updated_at = '2024-01-01T00:00:00Z'
-    mock_epic.start_date = None
-    mock_epic.end_date = None
-    mock_epic.parent_id = None
-
-    mock_group.epics.get.return_value = mock_epic
-    mock_gitlab.groups.get.return_value = mock_group
+    gl_world.epic.labels = ['priority:high', 'type:epic']
 
     result = client.get_epic(123, 10)
 
@@ -82,76 +131,43 @@ def test_get_epic(client, mock_gitlab):
     assert result['iid'] == 10
 
 
-def test_get_child_epics(client, mock_gitlab):
-    """Test fetching child epics."""
-    mock_group = Mock()
-
-    # Create mock child epics
-    child1 = Mock()
-    child1.iid = 11
-    child1.id = 'gid://gitlab/Epic/124'
-    child1.title = 'Child Epic 1'
-    child1.state = 'opened'
-    child1.labels = []
-    child1.web_url = 'https://gitlab.example.com/groups/test/-/epics/11'
-    child1.created_at = '2024-01-01T00:00:00Z'
-    child1.updated_at = '2024-01-01T00:00:00Z'
-    child1.start_date = None
-    child1.end_date = None
-    child1.parent_id = 10
-
-    child2 = Mock()
-    child2.iid = 12
-    child2.id = 'gid://gitlab/Epic/125'
-    child2.title = 'Child Epic 2'
-    child2.state = 'opened'
-    child2.labels = []
-    child2.web_url = 'https://gitlab.example.com/groups/test/-/epics/12'
-    child2.created_at = '2024-01-01T00:00:00Z'
-    child2.updated_at = '2024-01-01T00:00:00Z'
-    child2.start_date = None
-    child2.end_date = None
-    child2.parent_id = 10
-
-    mock_group.epics.list.return_value = [child1, child2]
-    mock_gitlab.groups.get.return_value = mock_group
+def test_get_all_group_epics(client, gl_world):
+    """Test fetching every epic of a group, keeping parent links for in-memory traversal."""
+    # Create mock epics: a root and two children pointing at its internal ID
+    root = make_epic(id=123)
+    child1 = make_epic(
+        iid=11,
+        id=124,
+        title='Child Epic 1',
+        web_url='https://gitlab.example.com/groups/test/-/epics/11',
+        parent_id=123,
+    )
+    child2 = make_epic(
+        iid=12,
+        id=125,
+        title='Child Epic 2',
+        web_url='https://gitlab.example.com/groups/test/-/epics/12',
+        parent_id=123,
+    )
 
-    results = client.get_child_epics(123, 10)
+    gl_world.group.epics.list.return_value = iter([root, child1, child2])
 
-    assert len(results) == 2
-    assert results[0]['id'] == 'epic:123#11'
-    assert results[1]['id'] == 'epic:123#12'
+    results = client.get_all_group_epics(123)
+
+    assert [r['id'] for r in results] == ['epic:123#10', 'epic:123#11', 'epic:123#12']
     assert all(r['type'] == 'epic' for r in results)
+    assert [r['parent_epic_id'] for r in results] == [None, 123, 123]
 
-    # Verify that list was called with parent_id filter
-    mock_group.epics.list.assert_called_once()
-    call_kwargs = mock_group.epics.list.call_args[1]
-    assert call_kwargs['parent_id'] == 10
-    assert call_kwargs['all'] == True
+    # One unfiltered, streamed list call; parent matching happens in memory
+    gl_world.group.epics.list.assert_called_once_with(iterator=True, per_page=PER_PAGE)
 
 
-def test_get_epic_issues(client, mock_gitlab):
+def test_get_epic_issues(client, gl_world):
     """Test fetching issues in an epic."""
-    mock_group = Mock()
-    mock_epic = Mock()
-
     # Create mock issues
-    issue1 = Mock()
-    issue1.iid = 1
-    issue1.id = 456
-    issue1.project_id = 789
-    issue1.title = 'Issue 1'
-    issue1.state = 'opened'
-    issue1.labels = ['priority:high']
-    issue1.web_url = 'https://gitlab.example.com/project/repo/-/issues/1'
-    issue1.created_at = '2024-01-01T00:00:00Z'
-    issue1.updated_at = '2024-01-01T00:00:00Z'
-    issue1.closed_at = None
-    issue1.due_date = None
-
-    mock_epic.issues.list.return_value = [issue1]
-    mock_group.epics.get.return_value = mock_epic
-    mock_gitlab.groups.get.return_value = mock_group
+    issue1 = make_issue(title='Issue 1', labels=['priority:high'])
+
+    gl_world.epic.issues.list.return_value = [issue1]
 
     results = client.get_epic_issues(123, 10)
 
@@ -162,26 +178,14 @@ def test_get_epic_issues(client, mock_gitlab):
     assert results[0]['project_id'] == 789
 
 
-def test_get_issue(client, mock_gitlab):
+def test_get_issue(client, gl_world):
     """Test fetching a single issue."""
-    mock_project = Mock()
-    mock_issue = Mock()
-    mock_issue.iid = 1
-    mock_issue.id = 456
-    mock_issue.title = 'Test Issue'
-    mock_issue.state = 'opened'
-    mock_issue.labels = ['bug', 'priority:high']
-    mock_issue.web_url = 'https://gitlab.example.com/project/repo/-/issues/1'
-    mock_issue.created_at = '2024-01-01T00:00:00Z'
-    mock_issue.updated_at = '2024-01-01T00:00:00Z'
-    mock_issue.closed_at = None
-    mock_issue.due_date = None
-    mock_issue.weight = 3
-    mock_issue.assignees = []
-    mock_issue.milestone = None
-
-    mock_project.issues.get.return_value = mock_issue
-    mock_gitlab.projects.get.return_value = mock_project
+    gl_world.issue.configure_mock(
+        labels=['bug', 'priority:high'],
+        weight=3,
+        assignees=[],
+        milestone=None,
+    )
 
     result = client.get_issue(789, 1)
 
@@ -192,80 +196,60 @@ def test_get_issue(client, mock_gitlab):
     assert result['weight'] == 3
 
 
-def test_get_issue_links(client, mock_gitlab):
+def test_get_issue_links(client, gl_world):
     """Test fetching issue relationships."""
-    mock_project = Mock()
-    mock_issue = Mock()
-
     # Mock blocking link
-    blocking_link = Mock()
-    blocking_link.link_type = 'blocks'
-    blocking_link_issue = Mock()
-    blocking_link_issue.iid = 2
-    blocking_link.issue = blocking_link_issue
+    blocking_link = SimpleNamespace(link_type='blocks', references={'full': 'group/repo#2'})
 
     # Mock blocked_by link
-    blocked_link = Mock()
-    blocked_link.link_type = 'is_blocked_by'
-    blocked_link_issue = Mock()
-    blocked_link_issue.iid = 3
-    blocked_link.issue = blocked_link_issue
-
-    mock_issue.links.list.return_value = [blocking_link, blocked_link]
-    mock_project.issues.get.return_value = mock_issue
-    mock_gitlab.projects.get.return_value = mock_project
+    blocked_link = SimpleNamespace(link_type='is_blocked_by', references={'full': 'group/repo#3'})
+
+    # Links without a link_type are plain relations
+    related_link = SimpleNamespace(references={'full': 'group/repo#4'})
 
-    blocks, blocked_by = client.get_issue_links(789, 1)
+    gl_world.issue.links.list.return_value = [blocking_link, blocked_link, related_link]
 
-    assert len(blocks) == 1
-    assert blocks[0] == 2
-    assert len(blocked_by) == 1
-    assert blocked_by[0] == 3
+    links = client.get_issue_links(789, 1)
 
+    assert links['blocks'] == ['group/repo#2']
+    assert links['blocked_by'] == ['group/repo#3']
+    assert links['related'] == ['group/repo#4']
 
-def test_rate_limiting(client, mock_gitlab):
+
+def test_rate_limiting(client, gl_world, _no_sleep):
     """Test that rate limiting delay is applied."""
-    mock_group = Mock()
-    mock_epic = Mock()
-    mock_epic.iid = 10
-    mock_epic.id = 'gid://gitlab/Epic/123'
-    mock_epic.title = 'Test Epic'
-    mock_epic.state = 'opened'
-    mock_epic.labels = []
-    mock_epic.web_url = 'https://gitlab.example.com/groups/test/-/epics/10'
-    mock_epic.created_at = '2024-01-01T00:00:00Z'
-    mock_epic.updated_at = '2024-01-01T00:00:00Z'
-    mock_epic.start_date = None
-    mock_epic.end_date = None
-    mock_epic.parent_id = None
-
-    mock_group.epics.get.return_value = mock_epic
-    mock_gitlab.groups.get.return_value = mock_group
+    gl_world.epic.issues.list.return_value = []
 
-    with patch('time.sleep') as mock_sleep:
-        client.get_epic(123, 10)
-        # Rate limit delay should be called
-        mock_sleep.assert_called_once()
+    client.get_epic_issues(123, 10)
 
+    # Rate limit delay should be called
+    assert _no_sleep.call_count == 1
 
-def test_error_handling(client, mock_gitlab):
+
+def test_error_handling(client, gl_world):
     """Test error handling for API failures."""
-    mock_group = Mock()
-    mock_group.epics.get.side_effect = Exception('API Error')
-    mock_gitlab.groups.get.return_value = mock_group
+    gl_world.group.epics.get.side_effect = Exception('API Error')
 
-    # Should log error and return None instead of raising
-    result = client.get_epic(123, 10)
-    assert result is None
+    # Unexpected errors propagate to the caller
+    with pytest.raises(Exception, match='API Error'):
+        client.get_epic(123, 10)
+
+    # A missing epic is reported as a ValueError
+    gl_world.group.epics.get.side_effect = gitlab.exceptions.GitlabGetError('404 Not found', 404)
+
+    with pytest.raises(ValueError, match='Epic 10 not found in group 123'):
+        client.get_epic(123, 10)
 
 
 def test_get_group_info(client, mock_gitlab):
     """Test fetching group information."""
-    mock_group = Mock()
-    mock_group.id = 123
-    mock_group.name = 'Test Group'
-    mock_group.full_path = 'parent/test-group'
-    mock_group.web_url = 'https://gitlab.example.com/groups/parent/test-group'
+    mock_group = SimpleNamespace(
+        id=123,
+        name='Test Group',
+        path='test-group',
+        full_path='parent/test-group',
+        web_url='https://gitlab.example.com/groups/parent/test-group',
+    )
 
     mock_gitlab.groups.get.return_value = mock_group
 
@@ -279,11 +263,13 @@ def test_get_group_info(client, mock_gitlab):
 
 def test_get_project_info(client, mock_gitlab):
     """Test fetching project information."""
-    mock_project = Mock()
-    mock_project.id = 789
-    mock_project.name = 'Test Project'
-    mock_project.path_with_namespace = 'parent/test-group/test-project'
-    mock_project.web_url = 'https://gitlab.example.com/parent/test-group/test-project'
+    mock_project = SimpleNamespace(
+        id=789,
+        name='Test Project',
+        path='test-project',
+        path_with_namespace='parent/test-group/test-project',
+        web_url='https://gitlab.example.com/parent/test-group/test-project',
+    )
 
     mock_gitlab.projects.get.return_value = mock_project
 
@@ -293,3 +279,58 @@ def test_get_project_info(client, mock_gitlab):
     assert result['id'] == 789
     assert result['name'] == 'Test Project'
     assert result['path_with_namespace'] == 'parent/test-group/test-project'
+
+
+def test_get_epics_issues_graphql(client, mock_gitlab):
+    """Test batched epic issue fetch via GraphQL, skipping truncated epics."""
+    mock_gitlab.groups.get.return_value = SimpleNamespace(full_path='test/group')
+
+    issue_node = {
+        'id': 'gid://gitlab/Issue/456',
+        'iid': '1',
+        'projectId': 789,
+        'title': 'Test Issue',
+        'state': 'opened',
+        'webUrl': 'https://gitlab.example.com/project/repo/-/issues/1',
+        'type': 'ISSUE',
+        'author': {'username': 'alice', 'name': 'Alice'},
+        'assignees': {'nodes': []},
+        'milestone': None,
+        'createdAt': '2024-01-01T00:00:00Z',
+        'updatedAt': '2024-01-01T00:00:00Z',
+        'labels': {'nodes': [{'title': 'priority::high'}]},
+        'taskCompletionStatus': {'count': 2, 'completedCount': 1},
+    }
+    mock_gitlab.http_post.return_value = {'data': {'group': {'epics': {
+        'pageInfo': {'hasNextPage': False, 'endCursor': None},
+        'nodes': [
+            {'id': 'gid://gitlab/Epic/123', 'iid': '10', 'title': 'Test Epic',
+             'issues': {'pageInfo': {'hasNextPage': False}, 'nodes': [issue_node]}},
+            {'id': 'gid://gitlab/Epic/124', 'iid': '11', 'title': 'Big Epic',
+             'issues': {'pageInfo': {'hasNextPage': True}, 'nodes': []}},
+        ],
+    }}}}
+
+    result = client.get_epics_issues_graphql(1, [10, 11])
+
+    assert list(result) == [10]
+    issue = result[10][0]
+    assert issue['id'] == 'issue:789#1'
+    assert issue['internal_id'] == 456
+    assert issue['issue_type'] == 'issue'
+    assert issue['labels_raw'] == ['priority::high']
+    assert issue['epic_id'] == 123
+    assert issue['epic_group_id'] == 1
+    assert issue['task_completion_status'] == 1
+    assert mock_gitlab.http_post.call_count == 1
+
+    # Subgroup epics reuse IIDs, so only the group's own epics may be returned
+    query = mock_gitlab.http_post.call_args.kwargs['post_data']['query']
+    assert 'includeDescendantGroups: false' in query
+
+
+def test_get_epics_issues_graphql_errors(client, mock_gitlab):
+    """Test GraphQL errors yield an empty result so callers fall back to REST."""
+    mock_gitlab.http_post.return_value = {'errors': [{'message': 'Field epics is unavailable'}]}
+
+    assert client.get_epics_issues_graphql(1, [10]) == {}
@@ -3,16 +3,54 @@ Tests for hierarchy building functionality.
 """
 
 import pytest
-from unittest.mock import Mock, MagicMock, patch
-from datetime import datetime, date
+from unittest.mock import Mock
 
 from gitlab_hierarchy.hierarchy_builder import HierarchyBuilder
 
 
+GROUP_ID = 123
+
+
+def _epic(iid, parent_iid=None, **fields):
+    """Build an epic dict as returned by get_all_epics_for_groups."""
+    epic = {
+        'id': f'epic:{GROUP_ID}#{iid}',
+        'type': 'epic',
+        'iid': iid,
+        'internal_id': 1000 + iid,
+        'parent_epic_id': 1000 + parent_iid if parent_iid is not None else None,
+        'group_id': GROUP_ID,
+        'title': f'Epic {iid}',
+        'state': 'opened',
+        'created_at': '2024-01-01T00:00:00Z',
+        'updated_at': '2024-01-01T00:00:00Z',
+    }
+    epic.update(fields)
+    return epic
+
+
+def _issue(iid, **fields):
+    """Build an issue dict as returned by get_epic_issues."""
+    issue = {
+        'id': f'issue:456#{iid}',
+        'type': 'issue',
+        'iid': iid,
+        'project_id': 456,
+        'title': f'Issue {iid}',
+        'state': 'opened',
+        'created_at': '2024-01-01T00:00:00Z',
+        'updated_at': '2024-01-01T00:00:00Z',
+    }
+    issue.update(fields)
+    return issue
+
+
 @pytest.fixture
 def mock_client():
     """Create a mock GitLab client."""
     client = Mock()
+    client.get_all_epics_for_groups.return_value = []
+    client.get_epic_issues.return_value = []
     return client
 
 
@@ -22,25 +60,17 @@ def builder(mock_client):
     return HierarchyBuilder(mock_client)
 
 
-def test_simple_epic_hierarchy(builder, mock_client):
-    """Test building hierarchy from a single epic with no children."""
-    # Mock the root epic
-    root_epic = {
-        'id': 'epic:123#1',
-        'type': 'epic',
-        'iid': 1,
-        'group_id': 123,
-        'title': 'Root Epic',
-        'state': 'opened',
-        'created_at': '2024-01-01T00:00:00Z',
-        'updated_at': '2024-01-01T00:00:00Z',
-    }
+def _build(builder, mock_client, epics, issues_by_epic=None, **kwargs):
+    """Run build_from_groups on the given epics, serving issues per epic IID."""
+    issues_by_epic = issues_by_epic or {}
+    mock_client.get_all_epics_for_groups.return_value = epics
+    mock_client.get_epic_issues.side_effect = lambda group_id, epic_iid: issues_by_epic.get(epic_iid, [])
+    return builder.build_from_groups([GROUP_ID], root_epic_iid=1, root_group_id=GROUP_ID, **kwargs)
 
-    mock_client.get_epic.return_value = root_epic
-    mock_client.get_child_epics.return_value = []
-    mock_client.get_epic_issues.return_value = []
 
-    hierarchy = builder.build_from_epic(123, 1)
+def test_simple_epic_hierarchy(builder, mock_client):
+    """Test building hierarchy from a single epic with no children."""
+    hierarchy = _build(builder, mock_client, [_epic(1)])
 
     assert len(hierarchy) == 1
     assert hierarchy[0]['id'] == 'epic:123#1'
@@ -49,59 +79,22 @@ def test_simple_epic_hierarchy(builder, mock_client):
     assert hierarchy[0]['parent_id'] is None
 
 
-def test_epic_with_child_epics(builder, mock_client):
-    """Test epic with child epics."""
-    root_epic = {
-        'id': 'epic:123#1',
-        'type': 'epic',
-        'iid': 1,
-        'group_id': 123,
-        'title': 'Root Epic',
-        'state': 'opened',
-        'created_at': '2024-01-01T00:00:00Z',
-        'updated_at': '2024-01-01T00:00:00Z',
-    }
+def test_root_epic_not_found(builder, mock_client):
+    """Test that a root epic outside the fetched groups is reported."""
+    with pytest.raises(ValueError, match="Root epic 1 not found"):
+        _build(builder, mock_client, [_epic(2)])
 
-    child_epic1 = {
-        'id': 'epic:123#2',
-        'type': 'epic',
-        'iid': 2,
-        'group_id': 123,
-        'title': 'Child Epic 1',
-        'state': 'opened',
-        'parent_id': 'epic:123#1',
-        'created_at': '2024-01-01T00:00:00Z',
-        'updated_at': '2024-01-01T00:00:00Z',
-    }
 
-    child_epic2 = {
-        'id': 'epic:123#3',
-        'type': 'epic',
-        'iid': 3,
-        'group_id': 123,
-        'title': 'Child Epic 2',
-        'state': 'opened',
-        'parent_id': 'epic:123#1',
-        'created_at': '2024-01-01T00:00:00Z',
-        'updated_at': '2024-01-01T00:00:00Z',
-    }
-
-    mock_client.get_epic.side_effect = [root_epic, child_epic1, child_epic2]
-    mock_client.get_child_epics.side_effect = [
-        [child_epic1, child_epic2],  # Children of root
-        [],  # Children of child_epic1
-        []   # Children of child_epic2
-    ]
-    mock_client.get_epic_issues.return_value = []
-
-    hierarchy = builder.build_from_epic(123, 1)
+def test_epic_with_child_epics(builder, mock_client):
+    """Test epic with child epics."""
+    hierarchy = _build(builder, mock_client, [_epic(1), _epic(2, parent_iid=1), _epic(3, parent_iid=1)])
 
     assert len(hierarchy) == 3
 
     # Check root epic
     root = next(h for h in hierarchy if h['id'] == 'epic:123#1')
     assert root['depth'] == 0
-    assert root['child_epic_count'] == 2
+    assert root['child_count'] == 2
 
     # Check child epics
     children = [h for h in hierarchy if h['parent_id'] == 'epic:123#1']
@@ -112,51 +105,15 @@ def test_epic_with_child_epics(builder, mock_client):
 
 def test_epic_with_issues(builder, mock_client):
     """Test epic with issues."""
-    root_epic = {
-        'id': 'epic:123#1',
-        'type': 'epic',
-        'iid': 1,
-        'group_id': 123,
-        'title': 'Root Epic',
-        'state': 'opened',
-        'created_at': '2024-01-01T00:00:00Z',
-        'updated_at': '2024-01-01T00:00:00Z',
-    }
+    issues = [_issue(1), _issue(2, state='closed', closed_at='2024-01-02T00:00:00Z')]
 
-    issue1 = {
-        'id': 'issue:456#1',
-        'type': 'issue',
-        'iid': 1,
-        'project_id': 456,
-        'title': 'Issue 1',
-        'state': 'opened',
-        'created_at': '2024-01-01T00:00:00Z',
-        'updated_at': '2024-01-01T00:00:00Z',
-    }
-
-    issue2 = {
-        'id': 'issue:456#2',
-        'type': 'issue',
-        'iid': 2,
-        'project_id': 456,
-        'title': 'Issue 2',
-        'state': 'closed',
-        'created_at': '2024-01-01T00:00:00Z',
-        'updated_at': '2024-01-02T00:00:00Z',
-        'closed_at': '2024-01-02T00:00:00Z',
-    }
-
-    mock_client.get_epic.return_value = root_epic
-    mock_client.get_child_epics.return_value = []
-    mock_client.get_epic_issues.return_value = [issue1, issue2]
-
-    hierarchy = builder.build_from_epic(123, 1)
+    hierarchy = _build(builder, mock_client, [_epic(1)], {1: issues})
 
     assert len(hierarchy) == 3
 
     # Check epic
     epic = next(h for h in hierarchy if h['type'] == 'epic')
-    assert epic['child_issue_count'] == 2
+    assert epic['child_count'] == 2
 
     # Check issues
     issues = [h for h in hierarchy if h['type'] == 'issue']
@@ -166,182 +123,118 @@ def test_epic_with_issues(builder, mock_client):
     assert all(issue['root_id'] == 'epic:123#1' for issue in issues)
 
 
-def test_max_depth_limit(builder, mock_client):
-    """Test that max_depth is respected."""
-    root_epic = {
-        'id': 'epic:123#1',
-        'type': 'epic',
-        'iid': 1,
-        'group_id': 123,
-        'title': 'Root Epic',
-        'state': 'opened',
-        'created_at': '2024-01-01T00:00:00Z',
-        'updated_at': '2024-01-01T00:00:00Z',
-    }
+@pytest.mark.parametrize("max_depth,expected_ids", [
+    (0, ['epic:123#1']),
+    (1, ['epic:123#1', 'epic:123#2']),
+    (2, ['epic:123#1', 'epic:123#2', 'epic:123#3']),
+])
+def test_max_depth_limit(builder, mock_client, max_depth, expected_ids):
+    """Test that max_depth prunes child epics below the limit."""
+    epics = [_epic(1), _epic(2, parent_iid=1), _epic(3, parent_iid=2)]
 
-    child_epic = {
-        'id': 'epic:123#2',
-        'type': 'epic',
-        'iid': 2,
-        'group_id': 123,
-        'title': 'Child Epic',
-        'state': 'opened',
-        'parent_id': 'epic:123#1',
-        'created_at': '2024-01-01T00:00:00Z',
-        'updated_at': '2024-01-01T00:00:00Z',
-    }
-
-    mock_client.get_epic.side_effect = [root_epic, child_epic]
-    mock_client.get_child_epics.side_effect = [
-        [child_epic],  # Children of root
-        []  # Would be children of child_epic, but max_depth stops it
-    ]
-    mock_client.get_epic_issues.return_value = []
+    hierarchy = _build(builder, mock_client, epics, max_depth=max_depth)
 
-    # Set max_depth to 1 - should only get root epic
-    hierarchy = builder.build_from_epic(123, 1, max_depth=0)
+    assert [h['id'] for h in hierarchy] == expected_ids
+    assert max(h['depth'] for h in hierarchy) == max_depth
 
-    assert len(hierarchy) == 1
-    assert hierarchy[0]['depth'] == 0
+    # Pruned epics are never visited, so their issues are never requested
+    requested = [call.args[1] for call in mock_client.get_epic_issues.call_args_list]
+    assert sorted(requested) == list(range(1, max_depth + 2))
 
 
 def test_include_closed_filter(builder, mock_client):
     """Test filtering of closed items."""
-    root_epic = {
-        'id': 'epic:123#1',
-        'type': 'epic',
-        'iid': 1,
-        'group_id': 123,
-        'title': 'Root Epic',
-        'state': 'opened',
-        'created_at': '2024-01-01T00:00:00Z',
-        'updated_at': '2024-01-01T00:00:00Z',
-    }
-
-    closed_child = {
-        'id': 'epic:123#2',
-        'type': 'epic',
-        'iid': 2,
-        'group_id': 123,
-        'title': 'Closed Child',
-        'state': 'closed',
-        'parent_id': 'epic:123#1',
-        'created_at': '2024-01-01T00:00:00Z',
-        'updated_at': '2024-01-02T00:00:00Z',
-        'closed_at': '2024-01-02T00:00:00Z',
-    }
-
-    mock_client.get_epic.return_value = root_epic
-    mock_client.get_child_epics.return_value = [closed_child]
-    mock_client.get_epic_issues.return_value = []
-
-    # With include_closed=False, should not include closed child
-    hierarchy = builder.build_from_epic(123, 1, include_closed=False)
+    epics = [
+        _epic(1),
+        _epic(2, parent_iid=1, state='closed', closed_at='2024-01-02T00:00:00Z'),
+        _epic(3, parent_iid=2),
+    ]
+    issues_by_epic = {1: [_issue(1), _issue(2, state='closed', closed_at='2024-01-02T00:00:00Z')]}
 
-    assert len(hierarchy) == 1
-    assert hierarchy[0]['state'] == 'opened'
+    # With include_closed=False, the closed child is skipped with its whole subtree
+    hierarchy = _build(builder, mock_client, [dict(e) for e in epics], issues_by_epic, include_closed=False)
 
-    # With include_closed=True, should include closed child
-    mock_client.get_epic.side_effect = [root_epic, closed_child]
-    mock_client.get_child_epics.return_value = [closed_child]
+    assert [h['id'] for h in hierarchy] == ['epic:123#1', 'issue:456#1']
+    assert all(h['state'] == 'opened' for h in hierarchy)
+    requested = [call.args[1] for call in mock_client.get_epic_issues.call_args_list]
+    assert requested == [1]
+    # Closed children are missing, so completion cannot be computed
+    assert hierarchy[0]['completion_pct'] is None
 
-    hierarchy = builder.build_from_epic(123, 1, include_closed=True)
+    # With include_closed=True, closed items and their descendants are kept
+    hierarchy = _build(builder, mock_client, [dict(e) for e in epics], issues_by_epic, include_closed=True)
 
-    # Should have both open and closed
-    assert len(hierarchy) >= 1
-    states = [h['state'] for h in hierarchy]
-    assert 'opened' in states
+    assert len(hierarchy) == 5
+    assert {h['state'] for h in hierarchy} == {'opened', 'closed'}
+    assert hierarchy[0]['completion_pct'] == 66.67
 
 
 def test_cycle_detection(builder, mock_client):
     """Test that cycles are detected and prevented."""
-    epic1 = {
-        'id': 'epic:123#1',
-        'type': 'epic',
-        'iid': 1,
-        'group_id': 123,
-        'title': 'Epic 1',
-        'state': 'opened',
-        'created_at': '2024-01-01T00:00:00Z',
-        'updated_at': '2024-01-01T00:00:00Z',
-    }
-
-    epic2 = {
-        'id': 'epic:123#2',
-        'type': 'epic',
-        'iid': 2,
-        'group_id': 123,
-        'title': 'Epic 2',
-        'state': 'opened',
-        'parent_id': 'epic:123#1',
-        'created_at': '2024-01-01T00:00:00Z',
-        'updated_at': '2024-01-01T00:00:00Z',
-    }
-
     # Create cycle: epic1 -> epic2 -> epic1
-    mock_client.get_epic.side_effect = [epic1, epic2]
-    mock_client.get_child_epics.side_effect = [
-        [epic2],  # Children of epic1
-        [epic1],  # Children of epic2 (cycle!)
-    ]
-    mock_client.get_epic_issues.return_value = []
+    epics = [_epic(1, parent_iid=2), _epic(2, parent_iid=1)]
 
-    hierarchy = builder.build_from_epic(123, 1)
+    hierarchy = _build(builder, mock_client, epics)
 
     # Should have epic1 and epic2, but not process epic1 again
-    assert len(hierarchy) == 2
-    epic_ids = [h['id'] for h in hierarchy]
-    assert 'epic:123#1' in epic_ids
-    assert 'epic:123#2' in epic_ids
+    assert [h['id'] for h in hierarchy] == ['epic:123#1', 'epic:123#2']
+    assert hierarchy[1]['depth'] == 1
+    assert hierarchy[1]['child_count'] == 0
 
 
-def test_hierarchy_path_calculation(builder, mock_client):
-    """Test that hierarchy_path is correctly calculated."""
-    root_epic = {
-        'id': 'epic:123#1',
-        'type': 'epic',
-        'iid': 1,
-        'group_id': 123,
-        'title': 'Root',
-        'state': 'opened',
-        'created_at': '2024-01-01T00:00:00Z',
-        'updated_at': '2024-01-01T00:00:00Z',
-    }
+def test_cycle_detection_shared_child(builder, mock_client):
+    """Test that an epic listed twice under the same parent is only added once."""
+    child = _epic(2, parent_iid=1)
 
-    child_epic = {
-        'id': 'epic:123#2',
-        'type': 'epic',
-        'iid': 2,
-        'group_id': 123,
-        'title': 'Child',
-        'state': 'opened',
-        'parent_id': 'epic:123#1',
-        'created_at': '2024-01-01T00:00:00Z',
-        'updated_at': '2024-01-01T00:00:00Z',
-    }
+    hierarchy = _build(builder, mock_client, [_epic(1), child, child])
+
+    assert [h['id'] for h in hierarchy] == ['epic:123#1', 'epic:123#2']
 
-    grandchild_issue = {
-        'id': 'issue:456#1',
-        'type': 'issue',
-        'iid': 1,
-        'project_id': 456,
-        'title': 'Grandchild Issue',
-        'state': 'opened',
-        'created_at': '2024-01-01T00:00:00Z',
-        'updated_at': '2024-01-01T00:00:00Z',
-    }
 
-    mock_client.get_epic.side_effect = [root_epic, child_epic]
-    mock_client.get_child_epics.side_effect = [
-        [child_epic],  # Children of root
-        []  # Children of child
+def test_sibling_order(builder, mock_client):
+    """Test that items keep depth-first order and siblings keep their fetched order."""
+    epics = [
+        _epic(1),
+        _epic(3, parent_iid=1),
+        _epic(2, parent_iid=1),
+        _epic(4, parent_iid=3),
     ]
-    mock_client.get_epic_issues.side_effect = [
-        [],  # Issues of root
-        [grandchild_issue]  # Issues of child
+
+    hierarchy = _build(builder, mock_client, epics, {2: [_issue(1), _issue(2)]})
+
+    assert [h['id'] for h in hierarchy] == [
+        'epic:123#1', 'epic:123#3', 'epic:123#4', 'epic:123#2',
+        'issue:456#1', 'issue:456#2',
     ]
+    positions = {h['id']: h['sibling_position'] for h in hierarchy}
+    assert positions['epic:123#3'] == 1
+    assert positions['epic:123#2'] == 2
+    assert positions['issue:456#1'] == 1
+    assert positions['issue:456#2'] == 2
+    assert positions['epic:123#1'] == 1
+
+
+def test_descendant_counts(builder, mock_client):
+    """Test child and descendant counts across epics and issues."""
+    epics = [_epic(1), _epic(2, parent_iid=1), _epic(3, parent_iid=2), _epic(4, parent_iid=1)]
+    issues_by_epic = {1: [_issue(1)], 3: [_issue(2), _issue(3)]}
+
+    hierarchy = _build(builder, mock_client, epics, issues_by_epic)
+    by_id = {h['id']: h for h in hierarchy}
+
+    assert by_id['epic:123#1']['child_count'] == 3
+    assert by_id['epic:123#1']['descendant_count'] == 6
+    assert by_id['epic:123#2']['descendant_count'] == 3
+    assert by_id['epic:123#3']['descendant_count'] == 2
+    assert by_id['epic:123#4']['descendant_count'] == 0
+    assert by_id['epic:123#4']['is_leaf'] == 1
+    assert by_id['issue:456#2']['is_leaf'] == 1
+    assert by_id['epic:123#3']['is_leaf'] == 0
 
-    hierarchy = builder.build_from_epic(123, 1)
+
+def test_hierarchy_path_calculation(builder, mock_client):
+    """Test that hierarchy_path is correctly calculated."""
+    hierarchy = _build(builder, mock_client, [_epic(1), _epic(2, parent_iid=1)], {2: [_issue(1)]})
 
     # Check hierarchy paths
     root = next(h for h in hierarchy if h['id'] == 'epic:123#1')
@@ -352,35 +245,53 @@ def test_hierarchy_path_calculation(builder, mock_client):
 
     grandchild = next(h for h in hierarchy if h['id'] == 'issue:456#1')
     assert grandchild['hierarchy_path'] == 'epic:123#1/epic:123#2/issue:456#1'
+    assert grandchild['depth'] == 2
 
 
 def test_metrics_calculation(builder, mock_client):
     """Test that derived metrics are calculated correctly."""
-    root_epic = {
-        'id': 'epic:123#1',
-        'type': 'epic',
-        'iid': 1,
-        'group_id': 123,
-        'title': 'Root Epic',
-        'state': 'opened',
-        'created_at': '2024-01-01T00:00:00Z',
-        'updated_at': '2024-01-10T00:00:00Z',
-        'due_date': '2024-01-05',  # Already past
-    }
+    root_epic = _epic(1, updated_at='2024-01-10T00:00:00Z', due_date='2024-01-05')  # Already past
 
-    mock_client.get_epic.return_value = root_epic
-    mock_client.get_child_epics.return_value = []
-    mock_client.get_epic_issues.return_value = []
-
-    hierarchy = builder.build_from_epic(123, 1)
+    hierarchy = _build(builder, mock_client, [root_epic])
 
     epic = hierarchy[0]
 
     # Should have days_open calculated
-    assert 'days_open' in epic
     assert epic['days_open'] is not None
     assert epic['days_open'] > 0
 
     # Should detect overdue
-    assert 'is_overdue' in epic
-    # This will be True if current date > due_date
+    assert epic['is_overdue'] == 1
+    assert epic['days_overdue'] > 0
+
+
+def test_completion_pct(builder, mock_client):
+    """Test completion percentage from closed children."""
+    epics = [_epic(1), _epic(2, parent_iid=1, state='closed')]
+    issues = [_issue(1), _issue(2, state='closed'), _issue(3, state='closed')]
+
+    hierarchy = _build(builder, mock_client, epics, {1: issues})
+
+    assert hierarchy[0]['completion_pct'] == 75.0
+    assert hierarchy[1]['completion_pct'] is None
+
+
+def test_graphql_issues_with_rest_fallback(builder, mock_client):
+    """Test that batched GraphQL issues are merged with REST results for epics it left out."""
+    epics = [_epic(1), _epic(2, parent_iid=1), _epic(3, parent_iid=1)]
+    # Epic 3 is missing from the GraphQL result (e.g. more than 100 issues), so it goes to REST
+    mock_client.get_epics_issues_graphql.return_value = {1: [_issue(1)], 2: [_issue(2), _issue(3)]}
+
+    hierarchy = _build(builder, mock_client, epics, {3: [_issue(4)]}, use_graphql=True)
+
+    mock_client.get_epics_issues_graphql.assert_called_once_with(GROUP_ID, [1, 2, 3])
+    mock_client.get_epic_issues.assert_called_once_with(GROUP_ID, 3)
+
+    assert [h['id'] for h in hierarchy] == [
+        'epic:123#1', 'epic:123#2', 'epic:123#3',
+        'issue:456#1', 'issue:456#2', 'issue:456#3', 'issue:456#4',
+    ]
+    by_id = {h['id']: h for h in hierarchy}
+    assert by_id['issue:456#3']['parent_id'] == 'epic:123#2'
+    assert by_id['issue:456#4']['parent_id'] == 'epic:123#3'
+    assert by_id['issue:456#4']['hierarchy_path'] == 'epic:123#1/epic:123#3/issue:456#4'
@@ -3,7 +3,7 @@ Tests for label parsing functionality.
 """
 
 import pytest
-from gitlab_hierarchy.label_parser import LabelParser
+from gitlab_hierarchy.label_parser import LabelParser, _LABEL_CACHE_SIZE
 
 
 def test_default_patterns():
@@ -134,6 +134,15 @@ def test_empty_labels():
     assert result['label_status'] is None
 
 
+def test_labels_raw_json():
+    """Test that original labels are kept as compact JSON."""
+    parser = LabelParser()
+
+    result = parser.parse_labels(['priority:high', 'bug'])
+
+    assert result['labels_raw'] == '["priority:high","bug"]'
+
+
 def test_parse_items_batch():
     """Test parsing labels for multiple items."""
     parser = LabelParser()
@@ -207,3 +216,34 @@ def test_special_characters_in_values():
     assert result['label_team'] == 'back-end'
     assert result['label_component'] == 'api/v2'
     assert result['label_status'] == 'ready-for-review'
+
+
+def test_discovered_categories_cached():
+    """Test discovered categories are reused until a new category appears."""
+    parser = LabelParser()
+
+    parser.parse_labels(['area:auth'])
+    first = parser.get_discovered_categories()
+    assert parser.get_discovered_categories() is first
+
+    # A known category does not invalidate the cached result
+    parser.parse_labels(['area:billing'])
+    assert parser.get_discovered_categories() is first
+
+    parser.parse_labels(['scope:internal'])
+    assert parser.get_discovered_categories() == {'area', 'scope'}
+
+
+def test_label_cache_bounded():
+    """Test the per-label cache stays bounded and evictions do not change results."""
+    parser = LabelParser()
+
+    for i in range(_LABEL_CACHE_SIZE + 100):
+        parser.parse_labels([f'area:value-{i}'])
+
+    assert parser._classify_cached.cache_info().currsize == _LABEL_CACHE_SIZE
+
+    # The earliest labels were evicted and are classified again
+    result = parser.parse_labels(['area:value-0', 'priority:high'])
+    assert result['label_custom_1'] == 'area:value-0'
+    assert result['label_priority'] == 'high'